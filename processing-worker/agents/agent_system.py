@@ -8,8 +8,9 @@ import time
 from typing import Dict, Any, Optional
 from openai import AsyncOpenAI
 
+from utils import fast_json
 from utils.logger import setup_logger, log_agent_interaction
-from utils.session_manager import ConversationSession
+from utils.session_manager import ConversationSession, session_manager
 from tools.property_search_advanced import PropertySearchAgent as AdvancedPropertySearchAgent
 from tools.fast_statistical_handler import FastStatisticalQueryHandler
 from unified_conversation_engine import unified_engine, ConversationStage
@@ -104,6 +105,10 @@ class WhatsAppAgentSystem:
                             # Properties are already reordered by priority in unified_conversation_engine
                             # Store ALL properties with pagination info
                             session.context['all_available_properties'] = properties
+                            session.context['all_available_property_ids'] = [
+                                self.unified_engine.get_property_id(prop) for prop in properties
+                            ]
+                            session.context.pop('formatted_property_lines', None)
                             session.context['properties_shown'] = 0
                             session.context['properties_per_batch'] = 10
                             
@@ -279,7 +284,7 @@ class WhatsAppAgentSystem:
                         # Format properties for WhatsApp (fallback or <7 properties)
                         properties_text = self.optimized_search.format_properties_for_whatsapp(
                             search_results['properties'], 
-                            conv_response.requirements.dict()
+                            conv_response.requirements.model_dump()
                         )
                         
                         # Update conversation stage
@@ -459,7 +464,7 @@ class ConversationAgent:
                     return self.formatter.format_help()
                 
                 if any(thanks in message_lower for thanks in ['thank', 'thanks', 'appreciate']):
-                    return f"You're welcome! {self.formatter.emojis['sparkles']} Anything else I can help you find? {self.formatter.emojis['property']}"
+                    return f"You're welcome! {self.formatter.EMOJIS['sparkles']} Anything else I can help you find? {self.formatter.EMOJIS['property']}"
             
             # Check if user is asking for detailed property information
             active_properties = session.context.get('active_properties', [])
@@ -527,7 +532,7 @@ Respond naturally and contextually."""
         
         # Add recent conversation history
         if session.conversation_history:
-            recent_messages = session.conversation_history[-4:]  # Last 4 exchanges
+            recent_messages = session.recent_messages(4)  # Last 4 exchanges
             context_parts.append("Recent conversation:")
             for msg in recent_messages:
                 role = "User" if msg['role'] == 'user' else "Assistant"
@@ -543,8 +548,7 @@ Respond naturally and contextually."""
                 address = prop.get('address', {})
                 if isinstance(address, str):
                     try:
-                        import json
-                        address = json.loads(address)
+                        address = fast_json.loads(address)
                     except:
                         address = {}
                 locality = address.get('locality', 'Dubai') if isinstance(address, dict) else 'Dubai'
@@ -687,8 +691,6 @@ class PropertySearchAgent:
                 clarification_context['preferred_property_type'] = 'apartment'
         
         # Update session
-        from utils.session_manager import SessionManager
-        session_manager = SessionManager()
         session_manager.update_session(session.user_id, session)
     
     def _parse_initial_collection(self, message_lower: str, clarification_context: dict):
@@ -782,8 +784,6 @@ class PropertySearchAgent:
             }
         
         # Update session in session manager
-        from utils.session_manager import SessionManager
-        session_manager = SessionManager()
         session_manager.update_session(session.user_id, session)
         
         logger.info(f"🔄 Updated session context with AI analysis for {session.user_id}")
@@ -829,8 +829,6 @@ class PropertySearchAgent:
                         properties_data.append(dict(prop))
                 
                 # Import session manager to update session
-                from utils.session_manager import SessionManager
-                session_manager = SessionManager()
                 session_manager.set_active_properties(session.user_id, properties_data)
                 
                 logger.info(f"🏠 PROPERTIES_STORED: {len(properties_data)} properties for user {session.user_id}")
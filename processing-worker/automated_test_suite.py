@@ -20,7 +20,7 @@ load_dotenv()
 
 # Import agent components
 from agents.agent_system import WhatsAppAgentSystem
-from utils.session_manager import SessionManager
+from utils.session_manager import session_manager
 
 # Set up logging
 logging.basicConfig(
@@ -34,7 +34,7 @@ class AgentTestSuite:
     
     def __init__(self):
         self.agent_system = WhatsAppAgentSystem()
-        self.session_manager = SessionManager()
+        self.session_manager = session_manager
         self.test_user_number = "+918281840462"
         self.session = None
         
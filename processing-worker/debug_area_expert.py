@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.insert(0, os.path.dirname(__file__))
 
-from utils.session_manager import SessionManager
+from utils.session_manager import session_manager
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -23,7 +23,6 @@ def check_session_requirements(user_number: str):
     Args:
         user_number: Phone number like +971501234567
     """
-    session_manager = SessionManager()
     
     print("\n" + "="*80)
     print(f"🔍 DEBUGGING AREA EXPERT FOR USER: {user_number}")
@@ -111,7 +110,7 @@ def check_session_requirements(user_number: str):
     
     # Check conversation history
     print(f"\n💬 Recent Conversation ({len(session.conversation_history)} messages):")
-    for msg in session.conversation_history[-5:]:
+    for msg in session.recent_messages(5):
         role = msg.get('role', 'unknown')
         content = msg.get('content', '')[:100]
         print(f"   {role}: {content}...")
@@ -123,7 +122,6 @@ def check_session_requirements(user_number: str):
 
 def list_all_sessions():
     """List all active sessions"""
-    session_manager = SessionManager()
     
     print("\n" + "="*80)
     print("📋 ALL ACTIVE SESSIONS")
@@ -21,7 +21,7 @@ load_dotenv()
 
 # Import agent components
 from agents.agent_system import WhatsAppAgentSystem
-from utils.session_manager import SessionManager
+from utils.session_manager import session_manager
 from src.services.messaging import fetch_org_metadata_internal
 
 # Set up logging
@@ -36,7 +36,7 @@ class LocalTestClient:
     
     def __init__(self):
         self.agent_system = WhatsAppAgentSystem()
-        self.session_manager = SessionManager()
+        self.session_manager = session_manager
         self.test_user_number = "+918281840462"  # Default test user
         self.test_business_account = "543107385407043"  # Default test business account
         self.session = None
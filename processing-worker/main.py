@@ -22,7 +22,7 @@ load_dotenv()
 # Import existing agent system (PRESERVED)
 from agents.agent_system import WhatsAppAgentSystem
 from utils.logger import setup_logger
-from utils.session_manager import SessionManager
+from utils.session_manager import session_manager
 
 # Import new services
 from src.config import config
@@ -58,7 +58,6 @@ app = FastAPI(
 
 # Initialize the agent system (PRESERVED)
 agent_system = WhatsAppAgentSystem()
-session_manager = SessionManager()
 
 # Global pub/sub processor
 pubsub_processor = None
@@ -1039,6 +1038,10 @@ async def shutdown_event():
     if pubsub_processor:
         pubsub_processor.stop_listening()
     
+    # Release the pooled OpenAI connections shared by the conversation engines
+    from unified_conversation_engine import UnifiedConversationEngine
+    await UnifiedConversationEngine.aclose()
+    
     logger.info("✅ [SHUTDOWN] Processing worker stopped")
 
 # Endpoint for testing (preserves existing chat functionality)
@@ -17,7 +17,7 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from src.services.area_expert_service import area_expert_service, trigger_area_expert_if_ready
 from src.services.agent_history import agent_history_service
-from utils.session_manager import SessionManager
+from utils.session_manager import session_manager
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -157,7 +157,6 @@ async def test_full_flow_simulation():
     
     try:
         test_user = "+918888888888"
-        session_manager = SessionManager()
         
         # Create a session with requirements
         session = session_manager.get_session(test_user)
@@ -0,0 +1,83 @@
+"""
+🧪 TESTS FOR RESPONSE CACHE
+Covers cache keys, invalidation and template selection
+"""
+
+import pytest
+
+from utils.response_cache import ResponseCache
+
+
+class TestCacheKeys:
+    """In-process cache keys and per-user invalidation"""
+
+    def test_equivalent_queries_share_a_key(self):
+        cache = ResponseCache()
+        context = {"user_id": "u1", "active_properties_count": 3, "ignored": "x"}
+        assert cache._generate_cache_key("  Villas in JBR ", context) == cache._generate_cache_key("villas in jbr", {
+            "active_properties_count": 3, "user_id": "u1",
+        })
+
+    def test_punctuation_and_spacing_variants_share_a_key(self):
+        cache = ResponseCache()
+        assert cache._generate_cache_key("Villas in  JBR?") == cache._generate_cache_key("villas in jbr.")
+        assert cache._generate_cache_key("budget 1.5M") != cache._generate_cache_key("budget 15M")
+
+    def test_invalidate_user_cache_only_drops_that_user(self):
+        cache = ResponseCache()
+        cache.set(cache._generate_cache_key("villas", {"user_id": "u1"}), {"answer": "a"})
+        cache.set(cache._generate_cache_key("villas", {"user_id": "u2"}), {"answer": "b"})
+        cache.set(cache._generate_cache_key("villas"), {"answer": "c"})
+
+        assert cache.invalidate_user_cache("u1") == 1
+        assert cache.get(cache._generate_cache_key("villas", {"user_id": "u1"})) is None
+        assert cache.get(cache._generate_cache_key("villas", {"user_id": "u2"})) == {"answer": "b"}
+        assert cache.get(cache._generate_cache_key("villas")) == {"answer": "c"}
+
+    def test_evicted_and_expired_keys_leave_the_user_index(self):
+        cache = ResponseCache(ttl_seconds=60)
+        key = cache._generate_cache_key("villas", {"user_id": "u1"})
+        cache.set(key, {"answer": "a"})
+        cache.cache[key]["timestamp"] -= 120
+
+        assert cache.get(key) is None
+        assert cache._user_keys == {}
+        assert cache.invalidate_user_cache("u1") == 0
+
+
+class TestTemplates:
+    """Template selection for non-search queries"""
+
+    @pytest.mark.parametrize("query,expected", [
+        ("Can I book a viewing?", "booking_confirmation"),
+        ("where is it", "location_info"),
+        ("book a viewing for the villas", None),  # search keywords always take the full pipeline
+        ("thanks", None),
+    ])
+    def test_can_use_template(self, query, expected):
+        assert ResponseCache().can_use_template(query) == expected
+
+
+class TestEviction:
+    """Write-ordered eviction and expiry"""
+
+    def test_set_evicts_oldest_write_when_full(self):
+        cache = ResponseCache()
+        for i in range(1001):
+            cache.set(cache._generate_cache_key(f"q{i}"), {"i": i})
+
+        assert len(cache.cache) == 1000
+        assert cache.get(cache._generate_cache_key("q0")) is None
+        assert cache.get(cache._generate_cache_key("q1000")) == {"i": 1000}
+
+    def test_clear_expired_stops_at_first_fresh_entry(self):
+        cache = ResponseCache(ttl_seconds=60)
+        for query in ("old", "older", "fresh"):
+            cache.set(cache._generate_cache_key(query), {"q": query})
+        cache.cache[cache._generate_cache_key("old")]["timestamp"] -= 120
+        cache.cache[cache._generate_cache_key("older")]["timestamp"] -= 120
+        # Rewriting a key moves it to the back, keeping write order == timestamp order
+        cache.set(cache._generate_cache_key("old"), {"q": "old"})
+
+        assert cache.clear_expired() == 1
+        assert list(key[0] for key in cache.cache) == ["fresh", "old"]
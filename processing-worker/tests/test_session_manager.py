@@ -0,0 +1,194 @@
+"""
+🧪 TESTS FOR SESSION MANAGER
+Covers property references against the active search results
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.services import messaging
+from utils import session_manager as session_manager_module
+from utils.session_manager import SessionManager
+
+
+class TestPropertyReference:
+    """Resolving "second", "2" or a name to one of the active properties"""
+
+    def setup_method(self):
+        self.manager = SessionManager()
+        self.user_id = "test-property-reference"
+        self.manager.clear_session(self.user_id)
+        self.properties = [
+            {"building_name": "Marina Gate", "property_type": "Apartment", "address": {"locality": "Dubai Marina"}},
+            {"building_name": None, "property_type": "Villa", "address": '{"locality": "Arabian Ranches"}'},
+            {"building_name": "Rimal", "property_type": "Apartment", "address": {"locality": "JBR"}},
+        ]
+        self.manager.set_active_properties(self.user_id, self.properties)
+
+    def test_ordinal_and_number(self):
+        assert self.manager.get_property_by_reference(self.user_id, "Second") is self.properties[1]
+        assert self.manager.get_property_by_reference(self.user_id, "3") is self.properties[2]
+        # Out of range numbers fall back to the first property like any unmatched reference
+        assert self.manager.get_property_by_reference(self.user_id, "7") is self.properties[0]
+
+    def test_name_matches_building_type_or_locality(self):
+        assert self.manager.get_property_by_reference(self.user_id, "rimal") is self.properties[2]
+        assert self.manager.get_property_by_reference(self.user_id, "villa") is self.properties[1]
+        assert self.manager.get_property_by_reference(self.user_id, "jbr") is self.properties[2]
+
+    def test_name_matching_is_case_folded(self):
+        properties = [{"building_name": "Marina Gate"}, {"building_name": "Straße Residence"}]
+        self.manager.set_active_properties(self.user_id, properties)
+        assert self.manager.get_property_by_reference(self.user_id, "STRASSE") is properties[1]
+
+    def test_replaced_properties_are_searched_afresh(self):
+        assert self.manager.get_property_by_reference(self.user_id, "rimal") is self.properties[2]
+        replacement = [{"building_name": "Rimal Tower", "property_type": "Penthouse"}]
+        # Search paths also swap the list in the context directly, bypassing set_active_properties
+        self.manager.get_session(self.user_id).context["active_properties"] = replacement
+        assert self.manager.get_property_by_reference(self.user_id, "penthouse") is replacement[0]
+
+
+class TestConversationHistory:
+    """Bounded per-session message history"""
+
+    def test_history_keeps_the_last_50_messages(self):
+        manager = SessionManager()
+        user_id = "test-history"
+        manager.clear_session(user_id)
+        for i in range(55):
+            manager.add_message_to_history(user_id, "user", f"m{i}")
+
+        session = manager.get_session(user_id)
+        assert len(session.conversation_history) == 50
+        assert session.conversation_history[0]["content"] == "m5"
+        assert [msg["content"] for msg in manager.get_conversation_history(user_id, limit=3)] == ["m52", "m53", "m54"]
+
+    def test_messages_read_like_dicts(self):
+        manager = SessionManager()
+        user_id = "test-history-message"
+        manager.clear_session(user_id)
+        manager.add_message_to_history(user_id, "user", "villas in jbr", metadata={"intent": "search"})
+        manager.get_session(user_id).add_message("assistant", "Here you go", "unified_engine")
+
+        first, second = manager.get_conversation_history(user_id)
+        assert (first["role"], first["content"], first["metadata"]) == ("user", "villas in jbr", {"intent": "search"})
+        assert second.get("agent_name") == "unified_engine"
+        assert second.get("missing", "n/a") == "n/a"
+        assert second["metadata"] == {} and second["type"] == "text"
+
+
+class TestExpiry:
+    """Cleanup of sessions idle past the timeout"""
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        clock = SimpleNamespace(now=time.time())
+        monkeypatch.setattr(session_manager_module.time, "time", lambda: clock.now)
+        return clock
+
+    def test_cleanup_drops_idle_sessions_and_keeps_active_ones(self, clock):
+        manager = SessionManager()
+        for user_id in ("test-idle", "test-active"):
+            manager.clear_session(user_id)
+            manager.get_session(user_id)
+
+        # Both were created before the timeout, but only one has been active since
+        clock.now += manager.session_timeout - 10
+        manager.update_session("test-active", manager.sessions["test-active"])
+        clock.now += 20
+
+        manager.cleanup_expired_sessions()
+        assert "test-idle" not in manager.sessions
+        assert "test-active" in manager.sessions
+
+        # The active session still expires once it goes idle itself
+        clock.now += manager.session_timeout
+        manager.cleanup_expired_sessions()
+        assert "test-active" not in manager.sessions
+
+    def test_new_sessions_sweep_expired_ones(self, clock):
+        manager = SessionManager()
+        for user_id in ("test-stale", "test-newcomer"):
+            manager.clear_session(user_id)
+        manager.get_session("test-stale")
+
+        clock.now += manager.session_timeout + 10
+        manager.get_session("test-newcomer")
+        assert "test-stale" not in manager.sessions
+        assert "test-newcomer" in manager.sessions
+
+
+class TestConversationSession:
+    """Per-session object layout"""
+
+    def test_session_has_no_instance_dict(self):
+        session = SessionManager().get_session("test-history")
+        assert not hasattr(session, "__dict__")
+
+
+class TestSessionInit:
+    """Loading org metadata into new sessions"""
+
+    @pytest.mark.asyncio
+    async def test_org_metadata_is_reused_for_a_recreated_session(self, monkeypatch):
+        calls = []
+
+        async def fake_fetch(user_number, whatsapp_business_account):
+            calls.append(user_number)
+            return {"org_id": "org-1", "org_name": "Prop8t", "customer_name": "Sara"}
+
+        monkeypatch.setattr(messaging, "fetch_org_metadata_internal", fake_fetch)
+        manager = SessionManager()
+        user_id = "test-org-metadata"
+        manager._org_metadata_cache.pop((user_id, "waba-1"), None)
+        manager.clear_session(user_id)
+        await manager.initialize_session_with_user_data(user_id, "waba-1")
+        manager.clear_session(user_id)
+        session = await manager.initialize_session_with_user_data(user_id, "waba-1")
+
+        assert calls == [user_id]
+        assert (session.org_id, session.customer_name) == ("org-1", "Sara")
+
+    @pytest.mark.asyncio
+    async def test_failed_lookups_are_retried(self, monkeypatch):
+        calls = []
+
+        async def fake_fetch(user_number, whatsapp_business_account):
+            calls.append(user_number)
+            return {"error": "API request timed out"}
+
+        monkeypatch.setattr(messaging, "fetch_org_metadata_internal", fake_fetch)
+        manager = SessionManager()
+        user_id = "test-org-metadata-error"
+        manager.clear_session(user_id)
+        await manager.initialize_session_with_user_data(user_id, "waba-1")
+        await manager.initialize_session_with_user_data(user_id, "waba-1")
+
+        assert calls == [user_id, user_id]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_initialisations_share_one_lookup(self, monkeypatch):
+        calls = []
+
+        async def fake_fetch(user_number, whatsapp_business_account):
+            calls.append(user_number)
+            await asyncio.sleep(0)
+            return {"error": "API request timed out"}
+
+        monkeypatch.setattr(messaging, "fetch_org_metadata_internal", fake_fetch)
+        manager = SessionManager()
+        user_id = "test-org-metadata-concurrent"
+        manager.clear_session(user_id)
+        first, second = await asyncio.gather(
+            manager.initialize_session_with_user_data(user_id, "waba-1"),
+            manager.initialize_session_with_user_data(user_id, "waba-1"),
+        )
+
+        assert calls == [user_id]
+        assert first is second
+        assert manager._init_requests == {}
+
@@ -0,0 +1,92 @@
+"""
+🧪 TESTS FOR TEXT PROCESSOR
+Covers cleanup, typo correction and intent signals
+"""
+
+import pytest
+
+from utils.text_processor import MessageProcessor
+
+
+@pytest.fixture(scope="module")
+def processor():
+    return MessageProcessor()
+
+
+class TestProcessMessage:
+    """End-to-end processing of a raw WhatsApp message"""
+
+    def test_booking_request_with_typos(self, processor):
+        result = processor.process_message("Can u boook a viewing tomorow at 5pm bro?")
+
+        assert result["corrected"] == "can you book a viewing tomorrow at 5pm"
+        assert result["corrections_made"] == ["'u' → 'you'", "'boook' → 'book'", "'tomorow' → 'tomorrow'"]
+        assert result["has_typos"] is True
+        signals = result["intent_signals"]
+        assert signals["time_expressions"] == ["tomorrow", "5pm"]
+        assert signals["booking_expressions"] == ["book", "viewing", "tomorrow", "5pm"]
+        assert processor.is_booking_message(result)
+
+    def test_cleanup_collapses_spaces_and_drops_punctuation(self, processor):
+        result = processor.process_message("I don't like the second one, it's  too small!!")
+
+        assert result["corrected"] == "i do not like the second one it is too small"
+        assert result["has_typos"] is False
+        assert result["intent_signals"]["property_references"] == ["second", "one", "it"]
+        assert not processor.is_booking_message(result)
+
+    def test_contractions_with_curly_apostrophes(self, processor):
+        assert processor.process_message("I’m free, can’t do Monday")["corrected"] == "i am free cannot do monday"
+
+    def test_repeated_messages_get_independent_results(self, processor):
+        first = processor.process_message("book the first one tomorrow")
+        first["intent_signals"]["property_references"].append("third")
+        first["corrections_made"].append("x")
+
+        second = processor.process_message("  book the first one tomorrow ")
+        assert second["intent_signals"]["property_references"] == ["first", "one"]
+        assert second["corrections_made"] == []
+
+    def test_correctly_spelled_words_are_not_typos(self, processor):
+        result = processor.process_message("Marina appointment bro")
+
+        assert result["corrected"] == "marina appointment"
+        assert result["has_typos"] is False
+
+    def test_clock_times(self, processor):
+        signals = processor.process_message("what about 10:30 am on monday")["intent_signals"]
+
+        assert signals["time_expressions"] == ["10:30 am", "monday"]
+        assert signals["booking_expressions"] == ["30 am"]
+
+    def test_time_words_also_count_as_booking_intent(self, processor):
+        signals = processor.process_message("tomorrow at 5pm")["intent_signals"]
+
+        assert signals["has_time"] and signals["has_booking_intent"]
+
+
+class TestBookingMessage:
+    """Booking detection from explicit booking words"""
+
+    @pytest.mark.parametrize("message,expected", [
+        ("I'd like booking a visit", True),
+        ("can we see it", True),
+        ("is it on facebook", False),
+        ("seems expensive", False),
+    ])
+    def test_booking_words(self, processor, message, expected):
+        assert processor.is_booking_message(processor.process_message(message)) is expected
+
+
+class TestPropertyReference:
+    """Picking the referenced property out of a processed message"""
+
+    @pytest.mark.parametrize("message,expected", [
+        ("show me teh frist apartement", "first"),
+        ("what about the secod one", "first"),  # "one" wins over "second"
+        ("tell me about the thrid", "third"),
+        ("hello there", ""),
+        ("is the phone line with you", ""),  # "one" and "it" only count as whole words
+    ])
+    def test_extract_property_reference(self, processor, message, expected):
+        assert processor.extract_property_reference(processor.process_message(message)) == expected
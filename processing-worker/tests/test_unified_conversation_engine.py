@@ -0,0 +1,540 @@
+"""
+🧪 TESTS FOR UNIFIED CONVERSATION ENGINE HELPERS
+Covers the pure (no network) requirement and message-matching helpers
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from tools.property_details_tool import property_details_tool
+from utils.session_manager import ConversationSession
+from unified_conversation_engine import (
+    ConversationStage,
+    UnifiedConversationEngine,
+    UserRequirements,
+    _PAGINATION_RE,
+    _canonical_property_type,
+    _regex_extract,
+    unified_engine,
+)
+
+
+class TestUserRequirements:
+    """Completeness checks on collected requirements"""
+
+    @pytest.mark.parametrize("location", ["any", "Anywhere", "All Areas", "any location"])
+    def test_flexible_location_counts_as_complete(self, location):
+        requirements = UserRequirements(
+            transaction_type="buy",
+            property_type="apartment",
+            location=location,
+            confidence_transaction=0.9,
+            confidence_property=0.9,
+        )
+        assert requirements.is_complete()
+        assert "location" not in requirements.get_missing_requirements()
+
+    def test_missing_location_is_reported(self):
+        requirements = UserRequirements(transaction_type="rent", confidence_transaction=0.9)
+        assert not requirements.is_complete()
+        assert "location" in requirements.get_missing_requirements()
+
+
+class TestPaginationDetection:
+    """Fallback detection of "show more" requests"""
+
+    @pytest.mark.parametrize("message", [
+        "show more", "Show More please", "shoe more", "show mor",
+        "any more properties?", "next batch", "LOAD MORE",
+    ])
+    def test_detects_pagination(self, message):
+        assert _PAGINATION_RE.search(message)
+
+    @pytest.mark.parametrize("message", [
+        "tell me about the first one", "what is the price", "book a viewing",
+    ])
+    def test_ignores_other_messages(self, message):
+        assert not _PAGINATION_RE.search(message)
+
+
+class TestRequirementsDiff:
+    """Fresh-search change detection while results are shown"""
+
+    def test_confident_changes_are_collected_with_confidence(self):
+        current = UserRequirements(location="Marina", budget_max=1000000)
+        candidate = UserRequirements(
+            location="JBR", confidence_location=0.9,
+            budget_max=1500000, confidence_budget=0.8,
+        )
+        assert UnifiedConversationEngine._diff_requirements(current, candidate) == {
+            "location": "JBR", "confidence_location": 0.9,
+            "budget_max": 1500000, "confidence_budget": 0.8,
+        }
+
+    def test_low_confidence_unchanged_and_flexible_values_are_ignored(self):
+        current = UserRequirements(location="Marina", property_type="villa")
+        candidate = UserRequirements(
+            location="Nearby", confidence_location=0.9,
+            property_type="villa", confidence_property=0.9,
+            transaction_type="rent", confidence_transaction=0.5,
+        )
+        assert UnifiedConversationEngine._diff_requirements(current, candidate) == {}
+
+
+class TestClarification:
+    """Clarification messages built from missing requirements"""
+
+    def test_mentions_known_details_and_asks_for_missing(self):
+        requirements = UserRequirements(
+            transaction_type="rent", location="Marina",
+            budget_min=80000, budget_max=100000,
+            confidence_transaction=0.9, confidence_location=0.9, confidence_budget=0.9,
+        )
+        message = unified_engine._generate_smart_clarification(requirements, "rent in marina")
+        assert message.startswith("Great! I see you're looking to rent, in Marina, budget 80k-100k.")
+        assert "What type of property?" in message
+
+    def test_first_turn_asks_core_questions(self):
+        message = unified_engine._generate_smart_clarification(UserRequirements(), "hi")
+        assert message.startswith("To find the perfect property for you, I need to know:\n\n1️⃣")
+
+    def test_repeated_state_is_served_from_cache(self):
+        requirements = UserRequirements(transaction_type="buy", property_type="villa")
+        first = unified_engine._generate_smart_clarification(requirements, "")
+        hits = UnifiedConversationEngine._build_clarification.cache_info().hits
+        assert unified_engine._generate_smart_clarification(requirements, "") == first
+        assert UnifiedConversationEngine._build_clarification.cache_info().hits == hits + 1
+
+
+class TestSessionRequirements:
+    """Requirements round-trip through the session context"""
+
+    def _session(self):
+        return ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={})
+
+    def test_parsed_model_is_reused_until_dict_changes(self):
+        session = self._session()
+        saved = UserRequirements(location="Marina", confidence_location=0.9)
+        unified_engine._save_requirements_to_session(session, saved)
+        assert unified_engine._get_requirements_from_session(session) is saved
+
+        session.context['user_requirements'] = {"location": "JBR"}
+        reloaded = unified_engine._get_requirements_from_session(session)
+        assert reloaded.location == "JBR"
+        assert unified_engine._get_requirements_from_session(session) is reloaded
+
+    def test_saving_unchanged_requirements_is_a_no_op(self):
+        session = self._session()
+        unified_engine._save_requirements_to_session(session, UserRequirements(location="Marina"))
+        stored, stamp = session.context['user_requirements'], session.context['last_updated']
+
+        unified_engine._save_requirements_to_session(session, UserRequirements(location="Marina"))
+        assert session.context['user_requirements'] is stored
+        assert session.context['last_updated'] == stamp
+
+        unified_engine._save_requirements_to_session(session, UserRequirements(location="JBR"))
+        assert session.context['user_requirements']['location'] == "JBR"
+
+
+class TestRegexExtraction:
+    """Rule-based fast path ahead of the LLM extraction"""
+
+    def test_fully_covered_message(self):
+        fields, coverage = _regex_extract("2BR apartment in Marina for rent under 1.5M")
+        assert coverage == 1.0
+        assert fields["budget_max"] == 1500000
+        assert fields["bedrooms"] == 2
+        assert fields["location"] == "Marina"
+        assert fields["property_type"] == "apartment"
+        assert fields["transaction_type"] == "rent"
+
+    def test_budget_range_and_longest_area_match(self):
+        fields, coverage = _regex_extract("looking to buy a villa in Dubai Marina, budget 2-3M")
+        assert coverage == 1.0
+        assert (fields["budget_min"], fields["budget_max"]) == (2000000, 3000000)
+        assert fields["location"] == "Dubai Marina"
+
+    @pytest.mark.parametrize("message", [
+        "apartment in Arjan for rent",   # unknown area
+        "not in marina",                 # negation
+        "apartment with pool in JBR",    # feature the patterns don't model
+    ])
+    def test_unexplained_words_lower_coverage(self, message):
+        _, coverage = _regex_extract(message)
+        assert coverage < 1.0
+
+    def test_conflicting_values_are_not_extracted(self):
+        assert _regex_extract("I want to buy or rent") == ({}, 0.0)
+
+
+class TestExtractionCache:
+    """LLM extraction results reused for repeated messages"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_message_skips_the_llm(self, monkeypatch):
+        calls = []
+
+        async def fake_completion(**kwargs):
+            calls.append(kwargs)
+            message = SimpleNamespace(content='{"location": "Arjan", "confidence_location": 0.9, "notes": "x"}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        monkeypatch.setattr(unified_engine, "_chat_completion", fake_completion)
+        current = UserRequirements(transaction_type="rent")
+        first = await unified_engine._extract_requirements_ai("something   in Arjan near the park", current)
+        second = await unified_engine._extract_requirements_ai("something in Arjan near the park", current)
+        assert len(calls) == 1
+        assert first == second
+        assert (second.location, second.transaction_type) == ("Arjan", "rent")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_intent_requests_share_one_call(self, monkeypatch):
+        calls = []
+
+        async def fake_completion(**kwargs):
+            calls.append(kwargs)
+            await asyncio.sleep(0.01)
+            message = SimpleNamespace(content='{"intent_category": "general", "is_fresh_search": false}')
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+        monkeypatch.setattr(unified_engine, "_chat_completion", fake_completion)
+        sessions = [ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={}) for _ in range(2)]
+        first, second = await asyncio.gather(*(
+            unified_engine._analyze_user_intent("is it near a good gym?", session) for session in sessions
+        ))
+        assert len(calls) == 1
+        assert first == second and first is not second
+        assert unified_engine._intent_requests == {}
+
+
+class TestSpeculativeExtraction:
+    """Requirement extraction overlapped with intent analysis while collecting"""
+
+    def _patch(self, monkeypatch, intent):
+        events = []
+
+        async def fake_intent(message, session):
+            events.append("intent start")
+            await asyncio.sleep(0.01)
+            events.append("intent end")
+            return intent
+
+        async def fake_extract(message, requirements):
+            events.append("extract start")
+            await asyncio.sleep(0.01)
+            events.append("extract end")
+            return requirements.model_copy(update={"location": "Arjan", "confidence_location": 0.9})
+
+        monkeypatch.setattr(unified_engine, "_analyze_user_intent", fake_intent)
+        monkeypatch.setattr(unified_engine, "_extract_requirements_ai", fake_extract)
+        return events
+
+    @pytest.mark.asyncio
+    async def test_extraction_runs_alongside_intent(self, monkeypatch):
+        events = self._patch(monkeypatch, {"intent_category": "search", "is_fresh_search": False})
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={})
+        response = await unified_engine.process_message("somewhere in Arjan", session)
+        assert events.index("extract start") < events.index("intent end")
+        assert events.count("extract start") == 1
+        assert response.requirements.location == "Arjan"
+
+    @pytest.mark.asyncio
+    async def test_unused_extraction_is_cancelled(self, monkeypatch):
+        events = self._patch(monkeypatch, {"intent_category": "pagination", "is_pagination_request": True})
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={})
+        await unified_engine.process_message("show more", session)
+        await asyncio.sleep(0.02)
+        assert "extract end" not in events
+
+    @pytest.mark.asyncio
+    async def test_active_property_details_fetched_alongside_intent(self, monkeypatch):
+        events = self._patch(monkeypatch, {"intent_category": "property_details", "is_property_question": True,
+                                           "is_fresh_search": False, "confidence": 0.9})
+
+        async def fake_details(property_id):
+            events.append("details start")
+            await asyncio.sleep(0.01)
+            return {"id": property_id, "title": "Marina Gate"}
+
+        async def fake_contextual(message, property_data):
+            return f"about {property_data['title']}"
+
+        monkeypatch.setattr(property_details_tool, "get_property_details", fake_details)
+        monkeypatch.setattr(unified_engine, "_generate_contextual_property_response", fake_contextual)
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "conversation_stage": ConversationStage.FOLLOW_UP, "active_property_id": "p1",
+            "active_properties": [{"id": "p1"}],
+        })
+        response = await unified_engine.process_message("does it have a gym?", session)
+        assert events.index("details start") < events.index("intent end")
+        assert events.count("details start") == 1
+        assert response.message == "about Marina Gate"
+
+
+class TestOpenAIClient:
+    """One pooled OpenAI client across engine instances"""
+
+    def test_engines_share_the_client(self):
+        assert UnifiedConversationEngine().openai is unified_engine.openai
+
+
+class TestStageDispatch:
+    """process_message routes on the stored conversation stage"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stage", ["ready_for_search", ConversationStage.READY_FOR_SEARCH])
+    async def test_raw_and_enum_stages_dispatch_alike(self, monkeypatch, stage):
+        async def fake_intent(message, session):
+            return {"intent_category": "search", "is_fresh_search": False}
+
+        monkeypatch.setattr(unified_engine, "_analyze_user_intent", fake_intent)
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "conversation_stage": stage,
+            "user_requirements": {"transaction_type": "buy", "property_type": "villa", "location": "Marina"},
+        })
+        response = await unified_engine.process_message("go ahead", session)
+        assert response.should_search_properties
+        assert session.context["conversation_stage"] == ConversationStage.SHOWING_RESULTS
+
+
+class TestActivePropertyQuestion:
+    """Questions about the selected property"""
+
+    @pytest.mark.asyncio
+    async def test_details_fetch_overlaps_intent_analysis(self, monkeypatch):
+        events = []
+
+        async def fake_details(property_id):
+            events.append("details start")
+            await asyncio.sleep(0.01)
+            events.append("details end")
+            return {"property_type": "Villa", "bedrooms": 3}
+
+        async def fake_intent(message, session):
+            events.append("intent start")
+            await asyncio.sleep(0.01)
+            events.append("intent end")
+            return {"is_location_request": False}
+
+        async def fake_answer(message, property_data):
+            return "answer"
+
+        monkeypatch.setattr(property_details_tool, "get_property_details", fake_details)
+        monkeypatch.setattr(unified_engine, "_analyze_user_intent", fake_intent)
+        monkeypatch.setattr(unified_engine, "_generate_contextual_property_response", fake_answer)
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "active_properties": [{"id": "p1"}], "active_property_id": "p1",
+        })
+        assert await unified_engine._generate_property_specific_response("does it have a pool", session) == "answer"
+        assert events.index("intent start") < events.index("details end")
+
+
+class TestPropertyTypeNormalization:
+    """Free-form property types mapped to database values"""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("villa village", "Villa village"),
+        ("Villas", "Villa"),
+        ("flat", "Apartment"),
+        ("3 bed", "Apartment"),
+        ("town house", "Townhouse"),
+        ("warehouse", "Warehouse"),
+    ])
+    def test_canonical_property_type(self, raw, expected):
+        assert _canonical_property_type(raw) == expected
+
+    def test_studio_search_params_force_zero_bedrooms(self):
+        params = unified_engine._convert_to_search_params(UserRequirements(property_type="studio"))
+        assert params["property_type"] == "Studio"
+        assert params["bedrooms"] == 0
+
+
+class TestPropertyReference:
+    """Property references extracted from lowercased messages"""
+
+    @pytest.mark.parametrize("message,expected", [
+        ("property #3", "3"),
+        ("2nd villa", "2"),
+        ("the second one", "2"),
+        ("option 4", "4"),
+        ("budget 2", None),
+        ("tell me about property 1", "1"),
+        ("increase to 80k for property 2", None),
+        ("what are the prices of option 3", None),
+        ("more about 25 or details of 4", "4"),
+    ])
+    def test_extract_property_reference(self, message, expected):
+        assert unified_engine._extract_property_reference(message) == expected
+
+
+class TestQuickIntent:
+    """Local intent classification for unambiguous short messages"""
+
+    def test_show_more_with_pagination_context(self):
+        intent = unified_engine._quick_intent_classify("show more", True, False, True)
+        assert intent["intent_category"] == "pagination"
+        assert intent["is_pagination_request"] and not intent["is_fresh_search"]
+
+    def test_property_number_with_active_properties(self):
+        intent = unified_engine._quick_intent_classify("tell me about property 2", True, False, False)
+        assert intent["intent_category"] == "property_details"
+        assert intent["is_property_question"]
+
+    def test_greeting(self):
+        assert unified_engine._quick_intent_classify("hi there!", False, False, False)["intent_category"] == "general"
+
+    @pytest.mark.parametrize("message", ["where is it?", "send me the location", "nearest hospital", "what's nearby"])
+    def test_location_ask_about_selected_property(self, message):
+        intent = unified_engine._quick_intent_classify(message, True, True, False)
+        assert intent["intent_category"] == "location"
+        assert intent["is_location_request"] and not intent["is_fresh_search"]
+
+    def test_search_spec_that_changes_requirements_is_fresh_search(self):
+        current = UserRequirements(transaction_type="rent", location="marina", property_type="apartment")
+        intent = unified_engine._quick_search_intent("villa in JBR for rent", current, True)
+        assert intent["is_fresh_search"] and intent["intent_category"] == "search"
+
+    @pytest.mark.parametrize("message", [
+        "apartment in Marina for rent",   # restates the current search
+        "is the villa in JBR available?", # question, not a pure search spec
+    ])
+    def test_other_search_messages_go_to_the_llm(self, message):
+        current = UserRequirements(transaction_type="rent", location="marina", property_type="apartment")
+        assert unified_engine._quick_search_intent(message, current, True) is None
+
+    @pytest.mark.parametrize("message,active,pagination", [
+        ("show more", False, False),             # nothing to paginate
+        ("show more villas in jbr", True, True),  # could be a new search
+        ("property 2", False, False),            # no results shown yet
+        ("hi, 2br in marina please", False, False),
+        ("where is it", True, False),            # no property selected
+    ])
+    def test_ambiguous_messages_go_to_the_llm(self, message, active, pagination):
+        assert unified_engine._quick_intent_classify(message, active, False, pagination) is None
+
+    def test_location_words_with_a_search_go_to_the_llm(self):
+        assert unified_engine._quick_intent_classify("villas near the metro in jbr", True, True, False) is None
+
+
+class TestAddressParsing:
+    """Property address normalization"""
+
+    def test_json_string_is_parsed_once_and_cached(self):
+        prop = {"address": '{"locality": "Dubai Marina"}'}
+        assert unified_engine._get_property_location(prop) == "Dubai Marina"
+        assert prop["address"] == {"locality": "Dubai Marina"}
+
+    def test_plain_text_address_is_used_as_location(self):
+        assert unified_engine._get_property_location({"address": "JBR Walk"}) == "JBR Walk"
+
+
+class TestPagination:
+    """"Show more" batches served from the stored search results"""
+
+    @pytest.mark.asyncio
+    async def test_next_batch_ids_come_from_stored_results(self):
+        properties = [{"original_property_id": f"orig_{i}", "id": i} for i in range(12)]
+        properties[11] = {"id": 11}
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "all_available_properties": properties, "properties_shown": 10, "properties_per_batch": 10,
+        })
+        response = await unified_engine._handle_pagination_request("show more", session, UserRequirements())
+        assert response.message == "pagination_request"
+        assert session.context["pagination_batch_ids"] == ["orig_10", "11"]
+        assert session.context["all_available_property_ids"][0] == "orig_0"
+
+    @pytest.mark.asyncio
+    async def test_text_batches_reuse_preformatted_lines(self):
+        properties = [{"property_type": "Villa", "bedrooms": i, "sale_price_aed": 1000000} for i in range(12)]
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "all_available_properties": properties, "properties_shown": 10, "properties_per_batch": 10,
+        })
+        response = await unified_engine._handle_pagination_request("show more", session, UserRequirements())
+        assert response.message.startswith("🏠 **Properties 11-12:**\n\n11. 🏠 *10BR Villa*\n💰 AED 1,000,000\n")
+        assert len(session.context["formatted_property_lines"]) == 12
+        assert session.context["properties_shown"] == 12
+
+
+class TestPropertyReordering:
+    """Alternative results ordered budget, location, then type expansion"""
+
+    def test_orders_by_expansion_kind(self):
+        criteria = UserRequirements(location="Marina", property_type="apartment", budget_max=1000000)
+        other = {"sale_price_aed": 900000, "property_type": "Apartment", "address": {"locality": "Dubai Marina"}}
+        villa = {"sale_price_aed": 900000, "property_type": "Villa", "address": {"locality": "Marina"}}
+        jbr = {"sale_price_aed": 900000, "property_type": "Apartment", "address": '{"locality": "JBR"}'}
+        pricier = {"sale_price_aed": 1200000, "property_type": "Apartment", "address": "Marina Walk"}
+        ordered = unified_engine._reorder_properties_by_priority([other, villa, jbr, pricier], True, criteria)
+        assert ordered == [pricier, jbr, villa, other]
+
+
+class TestPropertyDetails:
+    """WhatsApp details message for a single property"""
+
+    def test_optional_lines_are_included_when_present(self):
+        message = unified_engine._format_property_details({
+            "property_type": "Villa", "bedrooms": 4, "bathrooms": 1, "rent_price_aed": 250000,
+            "address": {"locality": "Arabian Ranches"}, "bua_sqft": 3200, "study": True, "maid_room": True,
+        }, "2")
+        assert message.startswith("🏠 **Property 2 Details:**\n\n🏢 *4BR Villa*\n💰 AED 250,000/year\n📍 Arabian Ranches\n🚿 1 bathroom\n")
+        assert "\n📐 3,200 sqft\n✨ study • maid room\n\n📞" in message
+
+    def test_optional_lines_are_skipped_when_absent(self):
+        message = unified_engine._format_property_details({"bathrooms": 2}, "1")
+        assert "🚿 2 bathrooms\n\n📞" in message
+
+    def test_repeat_request_reuses_formatted_text(self, monkeypatch):
+        prop = {"id": "details-test-1", "property_type": "Villa", "bedrooms": 3}
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "active_properties": [prop],
+        })
+        first = unified_engine._format_property_details(prop, "1", session)
+
+        monkeypatch.setattr(unified_engine, "_render_property_details", lambda *args: pytest.fail("re-rendered"))
+        assert unified_engine._format_property_details(prop, "1", session) is first
+
+    def test_new_results_are_rendered_again(self):
+        prop = {"id": "details-test-2", "property_type": "Villa", "bedrooms": 3, "sale_price_aed": 3000000}
+        session = ConversationSession(user_id="test", created_at=0.0, last_updated=0.0, context={
+            "active_properties": [prop],
+        })
+        assert "AED 3,000,000" in unified_engine._format_property_details(prop, "1", session)
+
+        repriced = {**prop, "sale_price_aed": 2500000}
+        session.context["active_properties"] = [repriced]
+        assert "AED 2,500,000" in unified_engine._format_property_details(repriced, "1", session)
+
+    def test_texts_are_not_shared_between_sessions(self):
+        prop = {"id": "details-test-3", "property_type": "Villa", "bedrooms": 3, "sale_price_aed": 3000000}
+        other = {**prop, "bedrooms": 5}
+        sessions = [
+            ConversationSession(user_id=user_id, created_at=0.0, last_updated=0.0, context={"active_properties": [p]})
+            for user_id, p in (("a", prop), ("b", other))
+        ]
+        assert "3BR" in unified_engine._format_property_details(prop, "1", sessions[0])
+        assert "5BR" in unified_engine._format_property_details(other, "1", sessions[1])
+
+
+class TestContextualPropertyPrompt:
+    """Prompt built for questions about the active property"""
+
+    @pytest.mark.asyncio
+    async def test_price_is_formatted_into_prompt(self, monkeypatch):
+        captured = {}
+
+        async def fake_completion(call_name, system_prompt, prompt, temperature, max_tokens):
+            captured["system_prompt"] = system_prompt
+            captured["prompt"] = prompt
+            return "ok"
+
+        monkeypatch.setattr(unified_engine, "_stream_text_completion", fake_completion)
+        property_data = {
+            "property_type": "Apartment", "bedrooms": 2, "title": "Marina Gate",
+            "sale_price_aed": 1500000, "address": '{"locality": "Dubai Marina"}',
+        }
+        assert await unified_engine._generate_contextual_property_response("Is parking included?", property_data) == "ok"
+        assert "Property: 2BR Apartment | Marina Gate | Dubai Marina | AED 1,500,000\n" in captured["prompt"]
+        assert 'Question: "Is parking included?"' in captured["prompt"]
+        assert "Is parking included?" not in captured["system_prompt"]
@@ -0,0 +1,118 @@
+"""
+🧪 TESTS FOR WHATSAPP FORMATTER
+Pins the exact text of the formatted WhatsApp messages
+"""
+
+import pytest
+
+from utils.whatsapp_formatter import whatsapp_formatter as formatter
+
+APARTMENT = {
+    'property_type': 'Apartment', 'bedrooms': 2, 'bathrooms': 3, 'bua_sqft': 1450, 'sale_price_aed': 2350000,
+    'address': {'locality': 'Dubai Marina'}, 'building_name': 'Marina Gate', 'study': True, 'park_pool_view': True,
+}
+VILLA = {'property_type': 'Villa', 'bedrooms': 4, 'rent_price_aed': 180000, 'address': {'city': 'Dubai'}}
+
+
+class TestPrices:
+    """Short AED price labels"""
+
+    @pytest.mark.parametrize("price,sale_or_rent,expected", [
+        (None, 'sale', "Price on request"),
+        (950, 'sale', "AED 950"),
+        (15500, 'sale', "AED 16K"),
+        (2350000, 'sale', "AED 2.4M"),
+        (1250000, 'rent', "AED 1.3M/year"),  # halves round up
+        (14500, 'sale', "AED 15K"),
+        (2350000.0, 'sale', "AED 2.4M"),
+    ])
+    def test_format_price(self, price, sale_or_rent, expected):
+        assert formatter.format_price(price, sale_or_rent) == expected
+
+
+class TestPropertyMessages:
+    """Cards, lists and single property details"""
+
+    def test_property_cards(self):
+        assert formatter.format_property_card(APARTMENT, 1) == (
+            "1. 🏢 *2BR Apartment*\n💰 AED 2.4M\n📍 Dubai Marina\n🚿 3 Bath • 📐 1,450 sqft"
+        )
+        assert formatter.format_property_card(VILLA) == "🏡 *4BR Villa*\n💰 AED 180K/year\n📍 Dubai"
+
+    def test_property_list(self):
+        assert formatter.format_property_list([APARTMENT, VILLA], "villas", 5) == (
+            "🎯 *Found 2 of 5 properties!*\n\n"
+            "1. 🏢 *2BR Apartment*\n💰 AED 2.4M\n📍 Dubai Marina\n🚿 3 Bath • 📐 1,450 sqft\n\n"
+            "2. 🏡 *4BR Villa*\n💰 AED 180K/year\n📍 Dubai\n\n"
+            "*Quick actions:*\n👉 Tell me about property 1\n📅 Book visit for property 2\n🔍 Show me cheaper options"
+        )
+
+    def test_single_property(self):
+        assert formatter.format_single_property(APARTMENT) == (
+            "🏢 *2BR in Marina Gate*\n\n💰 *AED 2.4M*\n📍 Dubai Marina\n🚿 3 Bath\n📐 1,450 sqft\n"
+            "✨ Study room, Pool view\n\n*Next steps:*\n📅 Book a visit\nℹ️ Tell me about location\n"
+            "🔍 Show similar properties"
+        )
+
+    def test_statistical_result(self):
+        assert formatter.format_statistical_result('cheapest', VILLA) == (
+            "🔥 *Cheapest property to rent*\n\n💰 *AED 180K/year*\n🏠 4BR Villa\n📍 Dubai\n\n"
+            "📅 Book visit • 🔍 Show similar properties"
+        )
+
+    def test_location_info(self):
+        assert formatter.format_location_info(APARTMENT) == (
+            "📍 *Marina Gate*\nDubai Marina\n\n*Nearby:*\n• Dubai Mall\n• JBR Beach\n• Marina Walk\n\n"
+            "Want to visit? Just say \"book visit\" 📅"
+        )
+
+    def test_unparsed_address_falls_back_to_dubai(self):
+        villa = {**VILLA, 'address': '{"locality": "Arabian Ranches"}'}
+        assert "📍 Dubai\n" in formatter.format_single_property(villa)
+        assert formatter.format_location_info(villa).startswith("📍 *Property*\nDubai\n")
+
+
+class TestFixedMessages:
+    """Greeting, help, error and confirmation messages"""
+
+    def test_greeting(self):
+        capabilities = (
+            "\n\n*I can help you:*\n• Find apartments, villas, penthouses\n• Get market prices and stats\n"
+            "• Schedule property visits\n• Compare different areas\n\nWhat are you looking for? 🔍"
+        )
+        assert formatter.format_greeting("Sara") == "Hey Sara! 🏠 I'm your Dubai property assistant." + capabilities
+        assert formatter.format_greeting("  ") == "Hey there! 🏠 I'm your Dubai property assistant." + capabilities
+
+    def test_no_results_help_and_error(self):
+        assert formatter.format_no_results("villas") == (
+            "🔍 *No properties found*\n\nLet me help you find something!\n\n*Try:*\n"
+            "• Try different areas (Marina, Downtown, JBR)\n• Adjust your budget range\n"
+            "• Consider different property types\n• Check nearby neighborhoods\n\n"
+            "Just tell me what you're looking for! 🏠"
+        )
+        assert formatter.format_help() == (
+            "ℹ️ *Here's what I can do:*\n\n*Try asking:*\n• \"Show me 2BR apartments in Marina\"\n"
+            "• \"What's the cheapest villa?\"\n• \"Find penthouses under 3M\"\n• \"Book visit for the first one\"\n\n"
+            "Just type naturally - I'll understand! 💫"
+        )
+        assert formatter.format_error() == (
+            "Oops! Something went wrong ℹ️\n\nPlease try again or ask me something else.\n\n"
+            "Need help? Just type \"help\" 🏠"
+        )
+
+    def test_booking_and_carousel_confirmations(self):
+        assert formatter.format_followup_booking("p1", "BK1") == (
+            "✅ *Visit scheduled!*\n\n📅 Booking ref: *BK1*\n\n"
+            "Our team will call you within 2 hours to confirm details.\n\nQuestions? Just message me! 📱"
+        )
+        assert formatter.format_carousel_sent_response(9) == (
+            "🏠 Here are 9 properties that match your search! I've sent you property cards with all the details."
+        )
+
+    @pytest.mark.parametrize("count,query,expected", [
+        (6, "show me all villas", False),
+        (7, "show me all villas", True),
+        (7, "what about the second", False),
+    ])
+    def test_should_use_carousel(self, count, query, expected):
+        assert formatter.should_use_carousel([{}] * count, query) is expected
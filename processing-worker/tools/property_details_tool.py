@@ -5,6 +5,7 @@ Fetches detailed property information for Know More button clicks
 
 import os
 import json
+import asyncio
 import requests
 from typing import Dict, Any, Optional
 from utils.logger import setup_logger
@@ -32,7 +33,7 @@ class PropertyDetailsTool:
         try:
             logger.info(f"🔍 Fetching property details for ID: {property_id}")
             
-            # Query the property_vectorstore table
+            # Query the property_vectorstore table (requests is blocking - run it off the event loop)
             url = f"{self.supabase_url}/rest/v1/property_vectorstore"
             headers = {
                 'apikey': self.api_key,
@@ -46,7 +47,7 @@ class PropertyDetailsTool:
                 'select': '*'
             }
             
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = await asyncio.to_thread(requests.get, url, headers=headers, params=params, timeout=10)
             
             # If no results found, try querying by id
             if response.status_code == 200:
@@ -57,7 +58,7 @@ class PropertyDetailsTool:
                         'id': f'eq.{property_id}',
                         'select': '*'
                     }
-                    response = requests.get(url, headers=headers, params=params, timeout=10)
+                    response = await asyncio.to_thread(requests.get, url, headers=headers, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -6,9 +6,9 @@ Author: AI Assistant
 Purpose: Generate helpful responses that guide users to better property matches
 """
 
-import json
 from typing import Dict, Any, List, Optional
 from tools.sophisticated_search_pipeline import SearchResult, SearchTier, SearchCriteria
+from utils import fast_json
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -85,9 +85,9 @@ class SophisticatedResponseGenerator:
         #     properties_text += self._format_property_item(prop, i)
         
         # Add specific suggestions
-        suggestions_text = "\n💡 **Other options you might consider:**\n"
-        for suggestion in search_result.suggestions[:3]:
-            suggestions_text += f"• {suggestion}\n"
+        suggestions_text = "\n💡 **Other options you might consider:**\n" + "".join(
+            f"• {suggestion}\n" for suggestion in search_result.suggestions[:3]
+        )
         
         footer = "\n👉 Click 'Know More' on any property card for details\n📞 Book viewing for any property\n🔍 Adjust my search criteria"
         
@@ -105,9 +105,9 @@ class SophisticatedResponseGenerator:
         # Explain how search was broadened with specific details
         broadening_explanation = self._explain_search_broadening(search_result.alternatives_found, criteria)
         
-        suggestions_text = "\n💡 *Recommendations:*\n"
-        for suggestion in search_result.suggestions:
-            suggestions_text += f"• {suggestion}\n"
+        suggestions_text = "\n💡 *Recommendations:*\n" + "".join(
+            f"• {suggestion}\n" for suggestion in search_result.suggestions
+        )
         
         footer = "\n🔍 Refine my search criteria\n👉 Click 'Know More' on any property card for details"
         
@@ -125,16 +125,16 @@ class SophisticatedResponseGenerator:
         insights_text = self._format_detailed_market_insights(search_result.alternatives_found, criteria)
         
         # Show actionable suggestions
-        suggestions_text = "\n🎯 **Here's what I recommend:**\n"
-        for suggestion in search_result.suggestions:
-            suggestions_text += f"• {suggestion}\n"
+        suggestions_text = "\n🎯 **Here's what I recommend:**\n" + "".join(
+            f"• {suggestion}\n" for suggestion in search_result.suggestions
+        )
         
         # Show sample properties if available
         properties_text = ""
         if search_result.properties:
-            properties_text = f"\n🏠 **Sample properties currently available:**\n\n"
-            for i, prop in enumerate(search_result.properties[:3], 1):
-                properties_text += self._format_property_item(prop, i)
+            properties_text = "\n🏠 **Sample properties currently available:**\n\n" + "".join(
+                self._format_property_item(prop, i) for i, prop in enumerate(search_result.properties[:3], 1)
+            )
         
         footer = "\n🔍 Adjust my search criteria\n📞 Speak with a property consultant\n💬 Get personalized recommendations"
         
@@ -213,7 +213,7 @@ What would you like to do next?"""
             address = prop.get('address', {})
             if isinstance(address, str):
                 try:
-                    address = json.loads(address)
+                    address = fast_json.loads(address)
                 except:
                     address = {}
             
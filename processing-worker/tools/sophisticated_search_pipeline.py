@@ -8,7 +8,7 @@ Purpose: Transform dead-end "no results" into intelligent suggestions
 """
 
 import os
-import json
+import logging
 import time
 import asyncio
 from typing import Dict, Any, List, Optional, Union, Tuple
@@ -17,12 +17,27 @@ from enum import Enum
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from utils import fast_json
 from utils.logger import setup_logger
 
 load_dotenv()
 logger = setup_logger(__name__)
 
 
+def _parse_addresses(properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Parse JSON-string addresses in place as rows come back from Supabase, so later passes only see dicts
+    """
+    for prop in properties:
+        address = prop.get('address')
+        if isinstance(address, str):
+            try:
+                prop['address'] = fast_json.loads(address)
+            except ValueError:
+                prop['address'] = {}
+    return properties
+
+
 class SearchTier(Enum):
     """Search tier levels for fallback strategy"""
     EXACT_MATCH = "exact_match"
@@ -129,7 +144,8 @@ class SophisticatedSearchPipeline:
         """
         start_time = time.time()
         
-        logger.info(f"🔍 Starting sophisticated search with criteria: {criteria.to_dict()}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🔍 Starting sophisticated search with criteria: %s", criteria.to_dict())
         
         # TIER 1: Exact Match Search
         exact_results = await self._execute_exact_search(criteria, limit)
@@ -180,7 +196,7 @@ class SophisticatedSearchPipeline:
             query = self._apply_criteria_filters(query, criteria)
             
             response = query.limit(limit).execute()
-            properties = response.data if response.data else []
+            properties = _parse_addresses(response.data) if response.data else []
             
             return SearchResult(
                 properties=properties,
@@ -348,6 +364,8 @@ class SophisticatedSearchPipeline:
             market_data = base_query.limit(1000).execute()  # Get larger sample for analysis
             
             if market_data.data:
+                _parse_addresses(market_data.data)
+                
                 # Analyze market by location
                 if criteria.location:
                     market_insights['location_analysis'] = self._analyze_location_market(market_data.data, criteria.location)
@@ -558,12 +576,7 @@ class SophisticatedSearchPipeline:
         
         for prop in properties:
             # Analyze locations
-            address = prop.get('address', {})
-            if isinstance(address, str):
-                try:
-                    address = json.loads(address)
-                except:
-                    address = {}
+            address = prop.get('address') or {}
             
             locality = address.get('locality', 'Unknown')
             analysis['locations'][locality] = analysis['locations'].get(locality, 0) + 1
@@ -591,12 +604,7 @@ class SophisticatedSearchPipeline:
         available_locations = {}
         
         for prop in market_data:
-            address = prop.get('address', {})
-            if isinstance(address, str):
-                try:
-                    address = json.loads(address)
-                except:
-                    address = {}
+            address = prop.get('address') or {}
             
             locality = address.get('locality', 'Unknown')
             available_locations[locality] = available_locations.get(locality, 0) + 1
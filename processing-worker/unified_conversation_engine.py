@@ -5,27 +5,488 @@ Replaces multiple conflicting systems with one intelligent, efficient engine
 """
 
 import os
-import json
+import re
+import asyncio
+import functools
+import logging
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from enum import Enum
 from pydantic import BaseModel
+import httpx
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
+from utils import fast_json
+from utils.inflight import shared_task
 from utils.logger import setup_logger
-from utils.session_manager import ConversationSession
+from utils.session_manager import ConversationSession, session_manager
+from utils.text_processor import keyword_re
+from tools.property_details_tool import property_details_tool
+from tools.smart_location_assistant import smart_location_assistant
 
-# Import sophisticated search components
-from tools.sophisticated_search_pipeline import (
-    sophisticated_search_pipeline, 
-    SearchCriteria, 
-    search_with_sophisticated_intelligence
-)
-from tools.sophisticated_response_generator import generate_sophisticated_response
+# Sophisticated search components are imported where used so turns that never
+# reach a search (clarifications, follow-ups) don't pay their import cost
+if TYPE_CHECKING:
+    from tools.sophisticated_search_pipeline import SearchCriteria
 
 logger = setup_logger(__name__)
 
 
+# Location values that mean "don't filter by location"
+_ANY_LOCATIONS = frozenset({"any", "anywhere", "all areas", "any location"})
+_NEARBY_LOCATIONS = frozenset({"nearby", "nearby areas"})
+_FLEXIBLE_LOCATIONS = _ANY_LOCATIONS | _NEARBY_LOCATIONS
+
+# Session context keys tied to the previous search, cleared when a fresh search starts
+_SEARCH_CONTEXT_KEYS = ('active_properties', 'last_search_params', 'active_property_id')
+
+# Clarification question per missing requirement
+_CLARIFICATION_QUESTIONS = {
+    "transaction_type": "Are you looking to *buy* or *rent* a property?",
+    "location": "Which area in Dubai are you interested in? (Marina, Downtown, JBR, etc.)",
+    "budget": "What's your budget range? (e.g., 80-100k for rent, 1-2M for purchase)",
+    "property_type": "What type of property? (villa, apartment, townhouse, penthouse, commercial, plot, villa village, etc.)"
+}
+
+# First-turn prompt when nothing is known yet
+_INITIAL_CLARIFICATION = (
+    "To find the perfect property for you, I need to know:\n\n"
+    "1️⃣ Are you looking to *buy* or *rent*?\n"
+    "2️⃣ Which area in Dubai? (Marina, Downtown, JBR, etc.)\n"
+    "3️⃣ What type of property? (apartment, villa, studio, etc.)"
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _format_budget_short(amount) -> str:
+    """Format a budget as 1.5M / 80k for conversational replies"""
+    if amount >= 1000000:
+        return f"{amount/1000000:.1f}M".rstrip('0').rstrip('.')
+    elif amount >= 1000:
+        return f"{amount/1000:.0f}k"
+    else:
+        return str(amount)
+
+
+# Boolean listing columns shown as feature labels, in display order
+_FLAG_FEATURES = (('study', 'study'), ('maid_room', 'maid room'), ('landscaped_garden', 'garden'))
+
+# Indexed by a "count != 1" bool
+_PLURAL_SUFFIX = ('', 's')
+
+
+@functools.lru_cache(maxsize=2048)
+def _format_aed(amount, per_year: bool = False) -> str:
+    """Format a price as "AED 1,500,000" (or ".../year"); listing prices repeat across results and batches"""
+    return f"AED {amount:,}/year" if per_year else f"AED {amount:,}"
+
+
+def _lowercase(message: str) -> str:
+    """Lowercase a message, skipping the copy when WhatsApp text is already lowercase"""
+    return message if message.islower() else message.lower()
+
+
+def _parse_address(prop) -> Any:
+    """
+    Return a property's address, parsing a JSON string once and caching the dict back on dict properties
+    Non-JSON strings are returned unchanged; a missing address gives {}
+    """
+    if isinstance(prop, dict):
+        address = prop.get('address', {})
+    else:
+        address = getattr(prop, 'address', {})
+    if isinstance(address, str):
+        try:
+            parsed = fast_json.loads(address)
+        except ValueError:
+            return address
+        if isinstance(prop, dict) and isinstance(parsed, dict):
+            prop['address'] = parsed
+        return parsed
+    return address
+
+
+# Keyword scans on lowercased messages, one regex pass each instead of a Python loop per keyword
+_OTHER_PROPERTIES_RE = keyword_re([
+    'other properties', 'different properties', 'show me others', 'other options',
+    'see more', 'what else', 'alternatives', 'other ones', 'different ones',
+    'show other', 'more properties', 'other listings'
+])
+_BROWSE_PROPERTIES_RE = keyword_re([
+    'show me all', 'list properties', 'list all properties', 'what properties', 'available properties',
+    'all options', 'browse properties', 'property list'
+])
+_PROPERTY_QUESTION_RE = keyword_re([
+    'bathroom', 'bedroom', 'kitchen', 'balcony', 'parking', 'pool', 'gym', 'garden',
+    'floor', 'sqft', 'square', 'size', 'area', 'furnish', 'view', 'direction',
+    'price', 'rent', 'sale', 'photo', 'image', 'visit', 'showing', 'available',
+    'feature', 'amenity', 'include', 'detail', 'spec', 'when built', 'age',
+    'maintenance', 'chiller', 'dewa', 'utilities'
+])
+_GENERAL_CHAT_RE = keyword_re([
+    'hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening',
+    'how are you', 'thank you', 'thanks', 'weather', 'dubai', 'tell me about',
+    'what other', 'show me more', 'different', 'other options'
+])
+_LOCATION_REQUEST_RE = keyword_re(['location', 'where', 'map', 'nearest', 'nearby'])
+# Budget/price wording means numbers are amounts, not property references.
+# Words match at a word start (so "prices" still counts); the k/m unit letters only as a
+# standalone letter run ("80k", "1.5 m"), not inside words like "me" or "look"
+_BUDGET_CONTEXT_RE = re.compile(
+    r"(?<![a-z])(?:budget|price|cost|aed|million|thousand|increase|decrease|change|set)"
+    r"|(?<![a-z])[km](?![a-z])"
+)
+
+_NAME_PHRASE_RE = keyword_re(['what is my name', "what's my name", 'my name is', 'i am', "i'm"])
+
+# Property references ("property 2", "2nd villa", "second one", "tell me about 3")
+_DIGIT_RE = re.compile(r'\d')
+_PROPERTY_NUM_RE = re.compile(r'property\s*(?:number\s*|#\s*)?(\d+)')
+_ORDINAL_NUM_RE = re.compile(r'(\d+)(?:st|nd|rd|th)')
+_PROPERTY_CONTEXT_RE = keyword_re(['property', 'apartment', 'villa', 'listing'])
+_ONE_OPTION_RE = keyword_re(['one', 'option'])
+_ORDINAL_WORDS = {'first': '1', 'second': '2', 'third': '3', 'fourth': '4', 'fifth': '5'}
+_ORDINAL_WORD_RE = keyword_re(_ORDINAL_WORDS)
+_PROPERTY_CONTEXT_NUM_RE = re.compile(r'(?:tell me about|details of|more about|property|option)\s+(\d+)')
+_NAME_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'my name is (\w+)',
+    r"i'?m (\w+)",
+    r'i am (\w+)',
+))
+
+
+# (substring, database value) in priority order - "villa village" must precede "villa"
+_PROPERTY_TYPE_RULES = (
+    ('villa village', 'Villa village'),
+    ('villa', 'Villa'),
+    ('apartment', 'Apartment'),
+    ('flat', 'Apartment'),
+    ('bed', 'Apartment'),
+    ('penthouse', 'Penthouse'),
+    ('studio', 'Studio'),
+    ('townhouse', 'Townhouse'),
+    ('town house', 'Townhouse'),
+    ('residential', 'Residential'),
+    ('commercial', 'Commercial'),
+    ('plot', 'Plot'),
+)
+
+
+@functools.lru_cache(maxsize=256)
+def _canonical_property_type(property_type: str) -> str:
+    """Map a free-form property type to the database value, falling back to title case"""
+    prop_type = property_type.lower()
+    for substring, canonical in _PROPERTY_TYPE_RULES:
+        if substring in prop_type:
+            return canonical
+    return property_type.title()
+
+
+# (field, confidence field, threshold) checked when deciding whether a message starts a fresh search
+_DIFF_SPECS = (
+    ("location", "confidence_location", 0.7),
+    ("budget_min", "confidence_budget", 0.7),
+    ("budget_max", "confidence_budget", 0.7),
+    ("property_type", "confidence_property", 0.7),
+    ("transaction_type", "confidence_transaction", 0.7),
+)
+
+# "Show more" style requests, including common typos ("shoe more", "show mor")
+_PAGINATION_RE = re.compile(
+    r"show\s*mor|more\s*propert|next\s*batch|more\s*results|see\s*more|view\s*more"
+    r"|load\s*more|get\s*more|shoe\s*more|more\s*prop|next\s*prop",
+    re.IGNORECASE,
+)
+
+# Rule-based fast path for messages that are fully described by simple patterns
+# ("2BR apartment in Marina for rent under 1.5M"); anything else goes to the LLM
+_AREA_NAMES = {
+    "dubai marina": "Dubai Marina", "marina": "Marina",
+    "downtown dubai": "Downtown Dubai", "downtown": "Downtown",
+    "jbr": "JBR", "jumeirah beach residence": "JBR",
+    "business bay": "Business Bay", "jlt": "JLT", "jumeirah lakes towers": "JLT",
+    "palm jumeirah": "Palm Jumeirah", "palm": "Palm Jumeirah",
+    "deira": "Deira", "bur dubai": "Bur Dubai", "sheikh zayed road": "Sheikh Zayed Road",
+    "dubai hills": "Dubai Hills", "arabian ranches": "Arabian Ranches",
+    "jumeirah": "Jumeirah", "al barsha": "Al Barsha", "barsha": "Al Barsha",
+    "tecom": "TECOM", "difc": "DIFC", "dubai south": "Dubai South",
+    "dubai investment park": "Dubai Investment Park",
+    "jvc": "JVC", "jumeirah village circle": "JVC",
+    "dubai sports city": "Dubai Sports City", "motor city": "Motor City",
+    "studio city": "Studio City", "internet city": "Internet City",
+    "media city": "Media City", "knowledge village": "Knowledge Village",
+    "academic city": "Academic City", "silicon oasis": "Silicon Oasis",
+    "city walk": "City Walk", "al sufouh": "Al Sufouh", "emaar beachfront": "Emaar Beachfront",
+    "creek harbour": "Creek Harbour", "meydan": "Meydan", "al furjan": "Al Furjan",
+    "any location": "any", "any area": "any", "anywhere": "any",
+}
+_AREA_RE = re.compile(
+    r"\b(" + "|".join(re.escape(area) for area in sorted(_AREA_NAMES, key=len, reverse=True)) + r")\b"
+)
+_BUDGET_RANGE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([km])?\s*(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*([km])\b")
+_BUDGET_RE = re.compile(r"(\d+(?:\.\d+)?)\s*([km])\b")
+_BEDROOMS_RE = re.compile(r"\b(\d+)\s*(?:br|bed|beds|bedroom|bedrooms|bhk)\b")
+_PROPERTY_TYPE_RE = re.compile(r"\b(villa|apartment|flat|studio|townhouse|penthouse|commercial|plot)s?\b")
+_TRANSACTION_RE = re.compile(r"\b(buy|buying|purchase|for sale|rent|renting|rental|lease)\b")
+_TRANSACTIONS = {
+    "buy": "buy", "buying": "buy", "purchase": "buy", "for sale": "buy",
+    "rent": "rent", "renting": "rent", "rental": "rent", "lease": "rent",
+}
+_FAST_EXTRACT_FILLER = frozenset({
+    "a", "an", "the", "i", "im", "m", "s", "me", "my", "we", "us", "to", "in", "at", "for", "of", "on",
+    "and", "with", "want", "wanna", "need", "looking", "look", "search", "find", "show", "get",
+    "some", "any", "please", "pls", "hi", "hello", "hey", "under", "below", "upto", "up", "max",
+    "budget", "around", "about", "aed", "dhs", "property", "properties", "options", "area",
+    "is", "am", "would", "like", "can", "you", "it", "its", "dubai",
+})
+_FAST_EXTRACT_MIN_COVERAGE = 1.0
+_FAST_EXTRACT_CONFIDENCE = 0.9
+
+
+def _budget_amount(number: str, unit: str) -> int:
+    return int(float(number) * (1_000_000 if unit == "m" else 1000))
+
+
+@functools.lru_cache(maxsize=4096)
+def _regex_extract(message: str) -> Tuple[Dict[str, Any], float]:
+    """
+    Extract requirements with precompiled patterns
+    Returns (fields, coverage) where coverage is the share of words explained by a pattern or filler;
+    fields is empty when the message is ambiguous (e.g. both buy and rent). Callers must not mutate fields.
+    """
+    text = _lowercase(message)
+    fields: Dict[str, Any] = {}
+    found: Dict[str, set] = {"location": set(), "property_type": set(), "transaction_type": set()}
+    
+    def take_area(match):
+        found["location"].add(_AREA_NAMES[match.group(1)])
+        return " "
+    
+    def take_range(match):
+        low, low_unit, high, unit = match.groups()
+        fields["budget_min"] = _budget_amount(low, low_unit or unit)
+        fields["budget_max"] = _budget_amount(high, unit)
+        return " "
+    
+    def take_budget(match):
+        # A single amount is an upper bound ("1.5M" means up to 1.5M)
+        fields.setdefault("budget_max", _budget_amount(*match.groups()))
+        return " "
+    
+    def take_bedrooms(match):
+        fields["bedrooms"] = int(match.group(1))
+        return " "
+    
+    def take_property_type(match):
+        property_type = match.group(1)
+        found["property_type"].add("apartment" if property_type == "flat" else property_type)
+        return " "
+    
+    def take_transaction(match):
+        found["transaction_type"].add(_TRANSACTIONS[match.group(1)])
+        return " "
+    
+    total_words = len(re.findall(r"[a-z0-9]+", text))
+    for pattern, take in (
+        (_AREA_RE, take_area),
+        (_BUDGET_RANGE_RE, take_range),
+        (_BUDGET_RE, take_budget),
+        (_BEDROOMS_RE, take_bedrooms),
+        (_PROPERTY_TYPE_RE, take_property_type),
+        (_TRANSACTION_RE, take_transaction),
+    ):
+        text = pattern.sub(take, text)
+    
+    for field, values in found.items():
+        if len(values) > 1:
+            return {}, 0.0
+        if values:
+            fields[field] = values.pop()
+    
+    leftover = [word for word in re.findall(r"[a-z0-9]+", text) if word not in _FAST_EXTRACT_FILLER]
+    coverage = 1.0 - len(leftover) / max(total_words, 1)
+    
+    if "location" in fields:
+        fields["confidence_location"] = _FAST_EXTRACT_CONFIDENCE
+    if "budget_min" in fields or "budget_max" in fields:
+        fields["confidence_budget"] = _FAST_EXTRACT_CONFIDENCE
+    if "property_type" in fields:
+        fields["confidence_property"] = _FAST_EXTRACT_CONFIDENCE
+    if "transaction_type" in fields:
+        fields["confidence_transaction"] = _FAST_EXTRACT_CONFIDENCE
+    return fields, coverage
+
+# Whole-message patterns the intent pre-classifier trusts without asking the LLM
+_PAGINATION_ONLY_RE = re.compile(
+    r"(?:please\s+)?(?:(?:show|shoe|see|view|load|get)\s*more|next)"
+    r"(?:\s+(?:properties|property|options|results|batch|please))?[\s!.?]*"
+)
+_PROPERTY_REF_ONLY_RE = re.compile(
+    r"(?:tell me about |show me |details of |more about )?(?:the )?(?:property|option)\s*#?\s*\d{1,2}[\s!.?]*"
+)
+_GREETING_ONLY_RE = re.compile(
+    r"(?:hi|hello|hey|ok|okay|thanks|thank you|good (?:morning|afternoon|evening))(?: there)?[\s!.?]*"
+)
+# Location-services asks about the selected property; no area names, so they can never be a new search
+_LOCATION_ONLY_RE = re.compile(
+    r"(?:please\s+)?(?:"
+    r"where is (?:it|this|that|the (?:property|place|building))(?: located)?"
+    r"|(?:send|share|show)(?: me)?(?: the)? (?:location|map|brochure|directions)"
+    r"|(?:get )?directions"
+    r"|(?:what(?:'s| is) )?(?:the )?(?:nearest|nearby|closest) (?:hospital|metro|school|mall|supermarket|beach|places)s?"
+    r"|what(?:'s| is) nearby"
+    r")(?: please)?[\s!.?]*"
+)
+
+# WhatsApp details message; the size and features blocks are '' when the listing has none
+_PROPERTY_DETAILS_TEMPLATE = """🏠 **Property {reference} Details:**
+
+🏢 *{bedrooms}BR {property_type}*
+💰 {price}
+📍 {location}
+🚿 {bathrooms} bathroom{plural}{size_block}{features_block}
+
+📞 Would you like to book a viewing or need more information about this property?"""
+
+# One numbered entry of the WhatsApp text list; features_line is '' when the listing has none
+_PROPERTY_LINE_TEMPLATE = "{number}. 🏠 *{bedrooms}BR {property_type}*\n💰 {price}\n📍 {location}\n{features_line}"
+
+# Free-text answer prompts: static instructions go in the system message (a stable, cacheable prefix),
+# only the per-turn facts in the user message
+_PROPERTY_RESPONSE_SYSTEM_PROMPT = """
+You are a friendly property assistant on WhatsApp. Answer the question about this property directly and conversationally.
+No letter format, signatures or placeholders like "[Your Name]". If a detail isn't listed, say so and offer to find out.
+End with a helpful next-step question or suggestion.
+"""
+# Active-property answer, filled per turn with format_map
+_PROPERTY_RESPONSE_TEMPLATE = 'Property: {bedrooms}BR {property_type} | {title} | {locality} | {price}\nQuestion: "{message}"'
+
+_GENERAL_QUESTION_SYSTEM_PROMPT = """
+You are a helpful real estate assistant. The user's message is a general question, not about a specific property.
+Answer in 1-2 brief, friendly sentences. Examples:
+- "Hello" → "Hi there! I'm here to help you with your property search."
+- "How are you?" → "I'm doing great, thanks for asking!"
+- "Tell me about Dubai" → "Dubai is an amazing city with world-class amenities and diverse neighborhoods."
+- "What's the weather like?" → "Dubai generally has sunny, warm weather year-round."
+"""
+
+_GENERAL_PROPERTY_SYSTEM_PROMPT = """
+The user is asking about properties they were shown. Give a concise, helpful response and guide them to ask about
+specific properties by number (e.g., "Tell me about property 1") or about the aspects they want to know.
+"""
+
+# Static extraction rules - kept byte-identical across calls so OpenAI prompt caching can reuse the prefix
+_EXTRACTION_SYSTEM_PROMPT = """
+Update property requirements from the user's new message.
+Input JSON: {"current": <current requirements>, "message": <new message>}
+Return JSON:
+{"transaction_type": null|"buy"|"rent", "location": null|"<area>"|"any",
+ "budget_min": null|int, "budget_max": null|int,
+ "property_type": null|"villa"|"apartment"|"townhouse"|"penthouse"|"studio"|"commercial"|"plot",
+ "bedrooms": null|int, "special_features": [str],
+ "confidence_transaction": 0-1, "confidence_location": 0-1, "confidence_budget": 0-1, "confidence_property": 0-1}
+
+BUDGET (always full AED, not thousands):
+- single amount = upper bound: "80k" → {budget_max: 80000}; "1.5M" → {budget_max: 1500000, budget_min: null}
+- range sets both: "80-100k" → {budget_min: 80000, budget_max: 100000}; "2-3M" → {budget_min: 2000000, budget_max: 3000000}
+- "any budget"/"no budget limit" → budget fields null
+
+LOCATION: any Dubai area mentioned (al Barsha, Marina, JBR, Downtown, Business Bay, Jumeirah, DIFC, ...)
+- "What are the other options in al Barsha" → {location: "al Barsha"}
+- "any location"/"anywhere" → {location: "any"}
+
+PROPERTY TYPE: "flat" = apartment; "2BR apartment" → {property_type: "apartment", bedrooms: 2}; "show me villas instead" → {property_type: "villa"}; "any property type" → null
+
+TRANSACTION: buy/purchase/for sale → "buy"; rent/lease/rental → "rent"; "switch to purchase" → {transaction_type: "buy"}
+
+CONFIDENCE: explicit mention 0.9+; stated flexibility ("any ...") 0.8+; implied 0.6-0.7; unclear 0.3-0.5
+Keep existing values unless the message gives new information.
+"""
+
+
+def _nullable(json_type: str, enum: Optional[List[str]] = None) -> Dict[str, Any]:
+    """JSON schema for a nullable field (strict structured outputs need every field listed as required)"""
+    schema: Dict[str, Any] = {"type": [json_type, "null"]}
+    if enum is not None:
+        schema["enum"] = [*enum, None]
+    return schema
+
+
+# Structured-output schema for the extraction reply - the API guarantees this shape, so no stray keys or "null" strings
+_EXTRACTION_PROPERTIES = {
+    "transaction_type": _nullable("string", ["buy", "rent"]),
+    "location": _nullable("string"),
+    "budget_min": _nullable("integer"),
+    "budget_max": _nullable("integer"),
+    "property_type": _nullable("string", ["villa", "apartment", "townhouse", "penthouse", "studio", "commercial", "plot"]),
+    "bedrooms": _nullable("integer"),
+    "special_features": {"type": "array", "items": {"type": "string"}},
+    "confidence_transaction": {"type": "number"},
+    "confidence_location": {"type": "number"},
+    "confidence_budget": {"type": "number"},
+    "confidence_property": {"type": "number"},
+}
+_EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "requirements_update",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": _EXTRACTION_PROPERTIES,
+            "required": list(_EXTRACTION_PROPERTIES),
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+# Structured-output schema for the intent reply - every consumer reads these exact keys
+_INTENT_PROPERTIES = {
+    "is_fresh_search": {"type": "boolean"},
+    "is_location_request": {"type": "boolean"},
+    "is_property_question": {"type": "boolean"},
+    "is_continuing_conversation": {"type": "boolean"},
+    "is_pagination_request": {"type": "boolean"},
+    "intent_category": {
+        "type": "string",
+        "enum": ["search", "location", "property_details", "followup", "pagination", "general"],
+    },
+    "confidence": {"type": "number"},
+}
+_INTENT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "intent",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": _INTENT_PROPERTIES,
+            "required": list(_INTENT_PROPERTIES),
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Static intent-analysis rules - the per-turn context goes in the user message so this prefix stays cacheable
+_INTENT_SYSTEM_PROMPT = """
+Classify the user's intent in a Dubai real-estate chat. Return JSON:
+{"is_fresh_search": bool, "is_location_request": bool, "is_property_question": bool,
+"is_continuing_conversation": bool, "is_pagination_request": bool,
+"intent_category": "search|location|property_details|followup|pagination|general", "confidence": 0-1}
+
+Rules (compare the message with the CURRENT requirements in the context):
+- Different location, budget, property type or buy/rent than current (incl. current None) → is_fresh_search=true.
+  e.g. current Marina + "options in al Barsha"; "increase budget to 150k"; "show me villas instead"; "switch to rent".
+- "show more", "next batch", typos like "shoe more" → is_pagination_request=true, is_fresh_search=false.
+- Map, directions, nearby places, brochure ("nearest hospital", "send map", "share location") → is_location_request=true, is_fresh_search=false.
+- is_property_question=true only for details/features/actions of the selected property ("How many bathrooms?", "Is parking included?", "Can I see photos?");
+  general chat ("Hello", "Tell me about Dubai", "What other properties do you have?") is not, even with a property selected.
+Judge intent, not keywords; tolerate typos.
+"""
+
+
 class ConversationStage(str, Enum):
     """Conversation stages matching your exact flow diagram"""
     USER_INITIATED = "user_initiated"
@@ -35,6 +496,12 @@ class ConversationStage(str, Enum):
     FOLLOW_UP = "follow_up"  # user asks about specific properties
 
 
+# Stages whose handler always runs requirement extraction next (str enum, so raw stored values match too)
+_EXTRACTING_STAGES = frozenset({None, ConversationStage.USER_INITIATED, ConversationStage.COLLECTING_REQUIREMENTS})
+# Stages where a selected property's details are usually needed to answer
+_PROPERTY_QUESTION_STAGES = frozenset({ConversationStage.SHOWING_RESULTS, ConversationStage.FOLLOW_UP})
+
+
 class UserRequirements(BaseModel):
     """Structured user requirements with confidence tracking"""
     # Core requirements (must have all 4 to proceed)
@@ -65,7 +532,7 @@ class UserRequirements(BaseModel):
         # Location is optional if user explicitly wants "any location" 
         has_location = (
             (self.location and self.confidence_location >= 0.7) or
-            (self.location == "any" or self.location == "anywhere" or self.location == "all areas")
+            (self.location and self.location.lower() in _ANY_LOCATIONS)
         )
         
         # Budget is optional - can search without budget restrictions
@@ -87,7 +554,7 @@ class UserRequirements(BaseModel):
             missing.append("property_type")
             
         # Location - only required if not explicitly "any"
-        has_any_location = self.location and self.location.lower() in ["any", "anywhere", "all areas", "any location"]
+        has_any_location = self.location and self.location.lower() in _ANY_LOCATIONS
         if not has_any_location and (not self.location or self.confidence_location < 0.7):
             missing.append("location")
             
@@ -121,12 +588,112 @@ class UnifiedConversationEngine:
     Replaces multiple conflicting systems with one intelligent engine
     """
     
+    # OpenAI client shared by every engine instance, so they all reuse one connection pool
+    _shared_openai: Optional[AsyncOpenAI] = None
+    
+    @classmethod
+    def _get_openai_client(cls) -> AsyncOpenAI:
+        """
+        Return the shared OpenAI client, creating it on first use
+        HTTP/2 multiplexes concurrent calls over a few TLS connections instead of a handshake per burst
+        """
+        if cls._shared_openai is None:
+            cls._shared_openai = AsyncOpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                max_retries=3,
+                timeout=httpx.Timeout(15.0, connect=3.0),
+                http_client=httpx.AsyncClient(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100)
+                )
+            )
+        return cls._shared_openai
+    
+    @classmethod
+    async def aclose(cls) -> None:
+        """
+        Close the shared OpenAI client (called on worker shutdown)
+        """
+        if cls._shared_openai is not None:
+            await cls._shared_openai.close()
+            cls._shared_openai = None
+    
     def __init__(self):
-        self.openai = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # Shared pooled client, bounded retries/timeouts and a concurrency cap so bursts
+        # across sessions queue locally instead of piling into OpenAI rate limits
+        self.openai = self._get_openai_client()
+        self._session_manager = session_manager
+        self._openai_semaphore = asyncio.Semaphore(int(os.getenv("OPENAI_CONCURRENCY", "12")))
         self.model = "gpt-4o-mini"
         
-        # Cache for common responses
-        self.response_cache = {}
+        # Stage handlers for process_message
+        self._stage_handlers = {
+            ConversationStage.USER_INITIATED: self._handle_user_initiated,
+            ConversationStage.COLLECTING_REQUIREMENTS: self._handle_collecting_requirements,
+            ConversationStage.READY_FOR_SEARCH: self._handle_ready_for_search,
+            ConversationStage.SHOWING_RESULTS: self._handle_showing_results,
+            ConversationStage.FOLLOW_UP: self._handle_follow_up,
+        }
+        # Extracted requirement updates keyed by (current requirements, message); repeated phrasings skip the OpenAI call
+        self._extraction_cache = TTLCache(maxsize=4096, ttl=3600)
+        # Intent analyses keyed by the exact per-turn prompt; repeated chatter skips the OpenAI call
+        self._intent_cache = TTLCache(maxsize=4096, ttl=3600)
+        # Intent calls still in flight, by the same prompt key
+        self._intent_requests: Dict[str, asyncio.Task] = {}
+        
+    def _log_prompt_cache_usage(self, call_name: str, response) -> None:
+        """
+        Log how many prompt tokens were served from OpenAI's prompt cache
+        """
+        usage = getattr(response, 'usage', None)
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', 0) or 0
+        if usage is not None:
+            logger.info(f"💾 [PROMPT_CACHE] {call_name}: {cached_tokens}/{usage.prompt_tokens} prompt tokens cached")
+        
+    async def _chat_completion(self, **kwargs):
+        """
+        Non-streaming chat completion, bounded by the shared OpenAI concurrency cap
+        """
+        async with self._openai_semaphore:
+            return await self.openai.chat.completions.create(**kwargs)
+    
+    async def _stream_text_completion(
+        self, call_name: str, system_prompt: str, prompt: str, temperature: float, max_tokens: int
+    ) -> str:
+        """
+        Stream a free-text completion and return the full text
+        WhatsApp delivers whole messages, so chunks are joined here; time to first token and prompt-cache usage are logged
+        """
+        start_time = time.time()
+        first_token_ms = None
+        parts = []
+        async with self._openai_semaphore:
+            stream = await self.openai.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    # The final chunk carries usage only
+                    self._log_prompt_cache_usage(call_name, chunk)
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_token_ms is None:
+                        first_token_ms = (time.time() - start_time) * 1000
+                    parts.append(delta)
+        
+        total_ms = (time.time() - start_time) * 1000
+        logger.info(f"⚡ [STREAM] {call_name}: first token {first_token_ms or 0:.0f}ms, total {total_ms:.0f}ms")
+        return "".join(parts).strip()
         
     async def process_message(self, message: str, session: ConversationSession) -> ConversationResponse:
         """
@@ -134,8 +701,21 @@ class UnifiedConversationEngine:
         Follows your exact flow diagram logic with fresh search detection
         """
         start_time = time.time()
+        context = session.context
+        extraction_task = None
+        details_task = None
         
         try:
+            # While collecting requirements the extraction call is (almost) always next - overlap it with intent analysis
+            stored_stage = context.get('conversation_stage')
+            if stored_stage in _EXTRACTING_STAGES:
+                speculative_requirements = self._get_requirements_from_session(session)
+                extraction_task = asyncio.create_task(self._extract_requirements_ai(message, speculative_requirements))
+            elif stored_stage in _PROPERTY_QUESTION_STAGES and context.get('active_property_id'):
+                # Questions about the selected property need its details - fetch them while intent is analyzed
+                prefetched_property_id = context['active_property_id']
+                details_task = asyncio.create_task(property_details_tool.get_property_details(prefetched_property_id))
+            
             # INTELLIGENT CONTEXT DETECTION: Use AI to understand user intent
             intent_analysis = await self._analyze_user_intent(message, session)
             
@@ -146,7 +726,7 @@ class UnifiedConversationEngine:
                 return await self._handle_pagination_request(message, session, self._get_requirements_from_session(session))
             
             # Handle general questions when there's an active property
-            has_active_property_id = bool(session.context.get('active_property_id'))
+            has_active_property_id = bool(context.get('active_property_id'))
             if (has_active_property_id and 
                 intent_analysis.get("intent_category") == "general" and 
                 not intent_analysis.get("is_property_question")):
@@ -155,41 +735,40 @@ class UnifiedConversationEngine:
             
             if intent_analysis.get("is_fresh_search"):
                 logger.info("🔄 FRESH_SEARCH detected by AI - resetting conversation stage")
-                session.context['conversation_stage'] = ConversationStage.USER_INITIATED
+                context['conversation_stage'] = ConversationStage.USER_INITIATED
                 # Clear previous search context
-                session.context.pop('active_properties', None)
-                session.context.pop('last_search_params', None)
-                session.context.pop('active_property_id', None)
+                for key in _SEARCH_CONTEXT_KEYS:
+                    context.pop(key, None)
             
-            # Get current conversation state
-            current_stage = ConversationStage(session.context.get('conversation_stage', ConversationStage.USER_INITIATED))
+            # Get current conversation state (raw stored strings match the str-valued enum keys directly)
+            current_stage = context.get('conversation_stage') or ConversationStage.USER_INITIATED
+            handler = self._stage_handlers.get(current_stage)
+            if handler is None:
+                # Fallback to user initiated
+                current_stage, handler = ConversationStage.USER_INITIATED, self._handle_user_initiated
             current_requirements = self._get_requirements_from_session(session)
             
-            logger.info(f"🎯 Processing message in stage: {current_stage}")
+            logger.info("🎯 Processing message in stage: %s", current_stage)
             
-            # STAGE 1: User Initiated - Apply your flow logic
-            if current_stage == ConversationStage.USER_INITIATED:
-                return await self._handle_user_initiated(message, session, current_requirements)
-            
-            # STAGE 2: Collecting Requirements - Gather the 4 required pieces
-            elif current_stage == ConversationStage.COLLECTING_REQUIREMENTS:
-                return await self._handle_collecting_requirements(message, session, current_requirements)
+            # STAGES 1-2: requirement collection, possibly with the extraction already done
+            if current_stage in _EXTRACTING_STAGES:
+                # The speculative extraction is only valid if it ran against the requirements we are about to use
+                pre_extracted = None
+                if extraction_task is not None and current_requirements == speculative_requirements:
+                    pre_extracted = await extraction_task
+                return await handler(message, session, current_requirements, pre_extracted=pre_extracted)
             
             # STAGE 3: Ready for Search - Execute property search
-            elif current_stage == ConversationStage.READY_FOR_SEARCH:
-                return await self._handle_ready_for_search(message, session, current_requirements)
-            
-            # STAGE 4: Showing Results - Handle carousel interactions
-            elif current_stage == ConversationStage.SHOWING_RESULTS:
-                return await self._handle_showing_results(message, session, current_requirements)
-            
-            # STAGE 5: Follow-up - Handle property-specific questions
-            elif current_stage == ConversationStage.FOLLOW_UP:
-                return await self._handle_follow_up(message, session, current_requirements)
-            
-            else:
-                # Fallback to user initiated
-                return await self._handle_user_initiated(message, session, current_requirements)
+            if current_stage == ConversationStage.READY_FOR_SEARCH:
+                return await handler(message, session, current_requirements)
+            
+            # STAGES 4-5: Showing results / follow-up reuse the intent analysis (and the prefetch, if still the same property)
+            if details_task is not None and context.get('active_property_id') != prefetched_property_id:
+                details_task = None
+            return await handler(
+                message, session, current_requirements,
+                intent_analysis=intent_analysis, prefetched_details=details_task
+            )
                 
         except Exception as e:
             logger.error(f"❌ Conversation engine error: {str(e)}")
@@ -198,16 +777,31 @@ class UnifiedConversationEngine:
                 stage=ConversationStage.USER_INITIATED,
                 requirements=UserRequirements()
             )
+        finally:
+            # Drop speculative work when the turn took another path
+            for task in (extraction_task, details_task):
+                if task is not None and not task.done():
+                    task.cancel()
     
-    async def _handle_user_initiated(self, message: str, session: ConversationSession, requirements: UserRequirements) -> ConversationResponse:
+    async def _handle_user_initiated(
+        self,
+        message: str,
+        session: ConversationSession,
+        requirements: UserRequirements,
+        pre_extracted: Optional[UserRequirements] = None
+    ) -> ConversationResponse:
         """
         Handle initial user message - extract what we can and ask for missing info
         Follows your flow: greet and ask for buy/rent, location, budget, property type
+        pre_extracted is the result of an extraction already run against these requirements
         """
         logger.info("🎯 STAGE 1: User Initiated")
         
         # Use AI to extract information from initial message
-        updated_requirements = await self._extract_requirements_ai(message, requirements)
+        if pre_extracted is not None:
+            updated_requirements = pre_extracted
+        else:
+            updated_requirements = await self._extract_requirements_ai(message, requirements)
         
         # Update session with extracted requirements
         self._save_requirements_to_session(session, updated_requirements)
@@ -231,7 +825,7 @@ class UnifiedConversationEngine:
             )
         
         # Generate smart clarification message
-        clarification_msg = await self._generate_smart_clarification(updated_requirements, message)
+        clarification_msg = self._generate_smart_clarification(updated_requirements, message)
         
         session.context['conversation_stage'] = ConversationStage.COLLECTING_REQUIREMENTS
         
@@ -241,14 +835,24 @@ class UnifiedConversationEngine:
             requirements=updated_requirements
         )
     
-    async def _handle_collecting_requirements(self, message: str, session: ConversationSession, requirements: UserRequirements) -> ConversationResponse:
+    async def _handle_collecting_requirements(
+        self,
+        message: str,
+        session: ConversationSession,
+        requirements: UserRequirements,
+        pre_extracted: Optional[UserRequirements] = None
+    ) -> ConversationResponse:
         """
         Handle requirement collection - extract info and check if complete
+        pre_extracted is the result of an extraction already run against these requirements
         """
         logger.info("🎯 STAGE 2: Collecting Requirements")
         
         # Update requirements with new message
-        updated_requirements = await self._extract_requirements_ai(message, requirements)
+        if pre_extracted is not None:
+            updated_requirements = pre_extracted
+        else:
+            updated_requirements = await self._extract_requirements_ai(message, requirements)
         self._save_requirements_to_session(session, updated_requirements)
         
         # Check if we now have everything
@@ -269,7 +873,7 @@ class UnifiedConversationEngine:
             )
         
         # Still missing info - ask for more
-        clarification_msg = await self._generate_smart_clarification(updated_requirements, message)
+        clarification_msg = self._generate_smart_clarification(updated_requirements, message)
         
         return ConversationResponse(
             message=clarification_msg,
@@ -298,69 +902,44 @@ class UnifiedConversationEngine:
             use_sophisticated_search=True
         )
     
-    async def _handle_showing_results(self, message: str, session: ConversationSession, requirements: UserRequirements) -> ConversationResponse:
+    async def _handle_showing_results(
+        self,
+        message: str,
+        session: ConversationSession,
+        requirements: UserRequirements,
+        intent_analysis: Optional[Dict[str, Any]] = None,
+        prefetched_details: Optional[asyncio.Task] = None
+    ) -> ConversationResponse:
         """
         Handle when properties are being shown - user might click "view more" or ask questions
         
         Note: AI intent analysis at top level should catch fresh searches and pagination,
-        but this function provides fallback logic for robustness.
+        but this function provides fallback logic for robustness. The top-level
+        intent_analysis is reused so a confident "not a fresh search" verdict skips
+        the second extraction round-trip.
         """
         logger.info("🎯 STAGE 4: Showing Results")
         
-        # FALLBACK: If AI missed a fresh search (location/budget/type change), extract and check
-        logger.info("🔍 FALLBACK: Checking if AI missed a fresh search request")
-        potential_new_requirements = await self._extract_requirements_ai(message, UserRequirements())
+        if (intent_analysis
+                and intent_analysis.get("is_fresh_search") is False
+                and intent_analysis.get("confidence", 0) >= 0.8):
+            # Top-level AI analysis is confident this is not a new search - nothing to merge
+            logger.info("⏭️ Skipping fallback extraction - intent analysis ruled out a fresh search")
+            potential_new_requirements = UserRequirements()
+        else:
+            # FALLBACK: If AI missed a fresh search (location/budget/type change), extract and check
+            logger.debug("🔍 FALLBACK: Checking if AI missed a fresh search request")
+            potential_new_requirements = await self._extract_requirements_ai(message, UserRequirements())
         
         # Check for significant changes that indicate fresh search
-        has_location_change = (
-            potential_new_requirements.location and 
-            potential_new_requirements.location != requirements.location and
-            potential_new_requirements.confidence_location >= 0.7 and
-            potential_new_requirements.location.lower() not in ["any", "anywhere", "all areas", "nearby"]
-        )
-        
-        has_budget_change = (
-            (potential_new_requirements.budget_min and potential_new_requirements.budget_min != requirements.budget_min) or
-            (potential_new_requirements.budget_max and potential_new_requirements.budget_max != requirements.budget_max)
-        ) and potential_new_requirements.confidence_budget >= 0.7
-        
-        has_property_type_change = (
-            potential_new_requirements.property_type and 
-            potential_new_requirements.property_type != requirements.property_type and
-            potential_new_requirements.confidence_property >= 0.7
-        )
-        
-        has_transaction_change = (
-            potential_new_requirements.transaction_type and 
-            potential_new_requirements.transaction_type != requirements.transaction_type and
-            potential_new_requirements.confidence_transaction >= 0.7
-        )
+        update_dict = self._diff_requirements(requirements, potential_new_requirements)
         
         # If any significant change detected, trigger fresh search
-        if has_location_change or has_budget_change or has_property_type_change or has_transaction_change:
-            logger.info(f"🔄 FALLBACK_FRESH_SEARCH detected:")
-            logger.info(f"   Location change: {has_location_change}")
-            logger.info(f"   Budget change: {has_budget_change}")  
-            logger.info(f"   Property type change: {has_property_type_change}")
-            logger.info(f"   Transaction change: {has_transaction_change}")
-            
-            # Merge changes with existing requirements
-            merged_requirements = requirements.copy()
-            if has_location_change:
-                merged_requirements.location = potential_new_requirements.location
-                merged_requirements.confidence_location = potential_new_requirements.confidence_location
-            if has_budget_change:
-                if potential_new_requirements.budget_min:
-                    merged_requirements.budget_min = potential_new_requirements.budget_min
-                if potential_new_requirements.budget_max:
-                    merged_requirements.budget_max = potential_new_requirements.budget_max
-                merged_requirements.confidence_budget = potential_new_requirements.confidence_budget
-            if has_property_type_change:
-                merged_requirements.property_type = potential_new_requirements.property_type
-                merged_requirements.confidence_property = potential_new_requirements.confidence_property
-            if has_transaction_change:
-                merged_requirements.transaction_type = potential_new_requirements.transaction_type
-                merged_requirements.confidence_transaction = potential_new_requirements.confidence_transaction
+        if update_dict:
+            logger.debug("🔄 FALLBACK_FRESH_SEARCH detected: changed=%s", list(update_dict))
+            
+            # Merge changes with existing requirements in a single copy
+            merged_requirements = requirements.model_copy(update=update_dict)
             
             self._save_requirements_to_session(session, merged_requirements)
             session.context['conversation_stage'] = ConversationStage.READY_FOR_SEARCH
@@ -379,34 +958,57 @@ class UnifiedConversationEngine:
             )
         
         # FALLBACK: Check for pagination request that AI might have missed
-        message_lower = message.lower().strip()
-        pagination_indicators = [
-            'show more', 'more properties', 'next batch', 'more results',
-            'see more', 'view more', 'load more', 'get more',
-            # Handle typos
-            'shoe more', 'show mor', 'more prop', 'next prop'
-        ]
-        
-        if any(indicator in message_lower for indicator in pagination_indicators):
+        if _PAGINATION_RE.search(message):
             logger.info("📄 FALLBACK: Pagination request detected that AI missed")
             return await self._handle_pagination_request(message, session, requirements)
         
         # Default: User asking about specific property or general question
         session.context['conversation_stage'] = ConversationStage.FOLLOW_UP
         return ConversationResponse(
-            message=await self._generate_property_specific_response(message, session),
+            message=await self._generate_property_specific_response(
+                message, session, intent_analysis=intent_analysis, prefetched_details=prefetched_details
+            ),
             stage=ConversationStage.FOLLOW_UP,
             requirements=requirements
         )
     
-    async def _handle_follow_up(self, message: str, session: ConversationSession, requirements: UserRequirements) -> ConversationResponse:
+    @staticmethod
+    def _diff_requirements(current: UserRequirements, candidate: UserRequirements) -> Dict[str, Any]:
+        """
+        Collect confidently changed fields (with their confidence) from candidate, ready for model_copy(update=...)
+        Flexible locations ("any", "nearby", ...) never count as a location change
+        """
+        update = {}
+        for field, confidence_field, threshold in _DIFF_SPECS:
+            new_value = getattr(candidate, field)
+            if not new_value or new_value == getattr(current, field):
+                continue
+            confidence = getattr(candidate, confidence_field)
+            if confidence < threshold:
+                continue
+            if field == 'location' and new_value.lower() in _FLEXIBLE_LOCATIONS:
+                continue
+            update[field] = new_value
+            update[confidence_field] = confidence
+        return update
+    
+    async def _handle_follow_up(
+        self,
+        message: str,
+        session: ConversationSession,
+        requirements: UserRequirements,
+        intent_analysis: Optional[Dict[str, Any]] = None,
+        prefetched_details: Optional[asyncio.Task] = None
+    ) -> ConversationResponse:
         """
         Handle follow-up questions about properties
         """
         logger.info("🎯 STAGE 5: Follow-up")
         
         # Generate contextual response about properties
-        response_msg = await self._generate_property_specific_response(message, session)
+        response_msg = await self._generate_property_specific_response(
+            message, session, intent_analysis=intent_analysis, prefetched_details=prefetched_details
+        )
         
         return ConversationResponse(
             message=response_msg,
@@ -417,153 +1019,100 @@ class UnifiedConversationEngine:
     async def _extract_requirements_ai(self, message: str, current_requirements: UserRequirements) -> UserRequirements:
         """
         Use AI to extract and update requirements from user message
+        Messages fully covered by the regex fast path skip the OpenAI call
         """
+        fast_fields, coverage = _regex_extract(message)
+        if fast_fields and coverage >= _FAST_EXTRACT_MIN_COVERAGE:
+            logger.info("⚡ [FAST_EXTRACT] Parsed without LLM: %s", fast_fields)
+            return current_requirements.model_copy(update=fast_fields)
+        
         try:
-            extraction_prompt = f"""
-Extract property requirements from this message. Update the existing requirements.
-
-Current requirements: {current_requirements.dict()}
-New message: "{message}"
-
-Extract and return JSON with these fields:
-{{
-    "transaction_type": null | "buy" | "rent",
-    "location": null | "al Barsha" | "Marina" | "JBR" | "Downtown" | "Business Bay" | "etc",
-    "budget_min": null | 80000 | 100000,
-    "budget_max": null | 100000 | 150000, 
-    "property_type": null | "villa" | "apartment" | "townhouse" | "penthouse" | "studio",
-    "bedrooms": null | 1 | 2 | 3 | 4,
-    "special_features": ["array of strings"],
-    "confidence_transaction": "float 0-1",
-    "confidence_location": "float 0-1", 
-    "confidence_budget": "float 0-1",
-    "confidence_property": "float 0-1"
-}}
-
-IMPORTANT PARSING RULES:
-
-BUDGET:
-- "80k" or "80-100k" means 80,000 to 100,000 AED
-- "1M" or "1.5M" means UP TO that amount (budget_max), not exact match
-- "1.5M" → budget_max: 1500000, budget_min: null (find properties up to 1.5M)
-- "2-3M" means 2,000,000 to 3,000,000 AED (both min and max specified)  
-- Always return budget values in actual AED (not thousands)
-- Examples: "80k" → budget_max: 80000, "1.5M" → budget_max: 1500000
-
-LOCATION EXTRACTION (CRITICAL):
-- Extract ANY location mentioned: "al Barsha", "Marina", "JBR", "Downtown", "Business Bay", "Jumeirah", etc.
-- Patterns: "options in [area]", "properties in [area]", "what about [area]", "different area", "other location"
-- "What are the other options in al Barsha" → location: "al Barsha"
-- "Show me Marina properties" → location: "Marina"  
-- "Any apartments in JBR" → location: "JBR"
-- Set high confidence (0.9+) when location is explicitly mentioned
-- "any location", "anywhere" → location: "any"
-- Common Dubai areas: al Barsha, Marina, Dubai Marina, JBR, Downtown, Business Bay, Jumeirah, DIFC, etc.
-
-PROPERTY TYPE EXTRACTION (CRITICAL):
-- Extract ANY property type mentioned: "villa", "apartment", "flat", "townhouse", "penthouse", "studio", "commercial", "plot"
-- Patterns: "show me [type]", "[type] properties", "looking for [type]", "I want [type]"
-- "show me villas instead" → property_type: "villa"
-- "apartments in Marina" → property_type: "apartment"
-- "looking for townhouses" → property_type: "townhouse"
-- "I want a penthouse" → property_type: "penthouse"
-- "2BR apartment" → property_type: "apartment", bedrooms: 2
-- Set high confidence (0.9+) when property type is explicitly mentioned
-- Handle variations: "flat" = "apartment", "2BR" = bedrooms: 2
-
-TRANSACTION TYPE EXTRACTION (CRITICAL):
-- Extract ANY transaction mentioned: "buy", "purchase", "rent", "lease", "sale"
-- Patterns: "I want to [transaction]", "looking to [transaction]", "switch to [transaction]"
-- "I want to buy now" → transaction_type: "buy"
-- "looking to rent" → transaction_type: "rent"  
-- "switch to purchase" → transaction_type: "buy"
-- "for sale" → transaction_type: "buy"
-- "rental properties" → transaction_type: "rent"
-- Set high confidence (0.9+) when transaction type is explicitly mentioned
-
-FLEXIBLE REQUIREMENTS:
-- If user says "any budget" or "no budget limit" → leave budget fields null
-- If user says "any location" → set location: "any"
-- If user says "any property type" → leave property_type null
-- If user is flexible, set confidence to 0.8+ to indicate certainty about flexibility
-
-Rules:
-- Keep existing values if not mentioned
-- Only update if new information is provided
-- High confidence (0.8+) for explicit mentions
-- Medium confidence (0.6-0.7) for implied
-- Low confidence (0.3-0.5) for unclear
-"""
-
-            response = await self.openai.chat.completions.create(
+            # Only set fields are sent (unset ones are null/0 anyway); whitespace differences don't split the cache
+            user_content = fast_json.dumps({
+                "current": current_requirements.model_dump(exclude_defaults=True),
+                "message": " ".join(message.split())
+            })
+            cached = self._extraction_cache.get(user_content)
+            if cached is not None:
+                logger.info("💾 [EXTRACTION_CACHE] hit: %s", cached)
+                return current_requirements.model_copy(update=cached)
+            
+            response = await self._chat_completion(
                 model=self.model,
-                messages=[{"role": "user", "content": extraction_prompt}],
-                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": _EXTRACTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_content}
+                ],
+                response_format=_EXTRACTION_RESPONSE_FORMAT,
                 temperature=0.1
             )
+            self._log_prompt_cache_usage("extraction", response)
             
-            extracted_data = json.loads(response.choices[0].message.content)
-            logger.info(f"🔍 RAW_EXTRACTION: {extracted_data}")
-            
-            # Clean up any "null" strings that should be None (AI sometimes returns "null" as string)
-            for key, value in extracted_data.items():
-                if value == "null" or value == "None":
-                    extracted_data[key] = None
-            
-            logger.info(f"🔍 CLEANED_EXTRACTION: {extracted_data}")
+            extracted_data = fast_json.loads(response.choices[0].message.content)
+            logger.info("🔍 EXTRACTION: %s", extracted_data)
             
-            # Update current requirements with extracted data
-            updated_requirements = current_requirements.copy()
-            for key, value in extracted_data.items():
-                if value is not None:
-                    setattr(updated_requirements, key, value)
+            # Update current requirements with extracted data (unknown keys are ignored should the schema ever drift)
+            non_null = {
+                key: value for key, value in extracted_data.items()
+                if value is not None and key in UserRequirements.model_fields
+            }
+            self._extraction_cache[user_content] = non_null
+            updated_requirements = current_requirements.model_copy(update=non_null)
             
-            logger.info(f"🔍 FINAL_REQUIREMENTS: {updated_requirements.dict()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 FINAL_REQUIREMENTS: %s", updated_requirements.model_dump())
             return updated_requirements
             
         except Exception as e:
             logger.error(f"❌ AI extraction failed: {e}")
             return current_requirements
     
-    async def _generate_smart_clarification(self, requirements: UserRequirements, original_message: str) -> str:
+    def _generate_smart_clarification(self, requirements: UserRequirements, original_message: str) -> str:
         """
         Generate intelligent clarification question based on what's missing
         Ask multiple questions in one turn when appropriate
         """
-        missing = requirements.get_missing_requirements()
-        
+        return self._build_clarification(
+            tuple(requirements.get_missing_requirements()),
+            requirements.transaction_type,
+            requirements.property_type,
+            requirements.location,
+            requirements.budget_min,
+            requirements.budget_max
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _build_clarification(
+        missing: Tuple[str, ...],
+        transaction_type: Optional[str],
+        property_type: Optional[str],
+        location: Optional[str],
+        budget_min: Optional[int],
+        budget_max: Optional[int]
+    ) -> str:
+        """
+        Build the clarification text - pure in its arguments, so repeated states hit the cache
+        """
         if not missing:
             return "Perfect! I have all the information I need."
         
-        # Create contextual clarification
-        clarification_map = {
-            "transaction_type": "Are you looking to *buy* or *rent* a property?",
-            "location": "Which area in Dubai are you interested in? (Marina, Downtown, JBR, etc.)",
-            "budget": "What's your budget range? (e.g., 80-100k for rent, 1-2M for purchase)",
-            "property_type": "What type of property? (villa, apartment, townhouse, penthouse, commercial, plot, villa village, etc.)"
-        }
+        # Initial conversation - ask core questions together
+        if len(missing) >= 3 and not (transaction_type or property_type or location or budget_min):
+            return _INITIAL_CLARIFICATION
         
         # Build smart question
         current_info = []
-        if requirements.transaction_type:
-            current_info.append(f"looking to {requirements.transaction_type}")
-        if requirements.property_type:
-            current_info.append(f"{requirements.property_type}s")  # "villas", "apartments"  
-        if requirements.location:
-            current_info.append(f"in {requirements.location}")
-        if requirements.budget_min:
-            # Convert budget to readable format
-            def format_budget(amount):
-                if amount >= 1000000:
-                    return f"{amount/1000000:.1f}M".rstrip('0').rstrip('.')
-                elif amount >= 1000:
-                    return f"{amount/1000:.0f}k"
-                else:
-                    return str(amount)
-            
-            budget_str = format_budget(requirements.budget_min)
-            if requirements.budget_max:
-                budget_str += f"-{format_budget(requirements.budget_max)}"
+        if transaction_type:
+            current_info.append(f"looking to {transaction_type}")
+        if property_type:
+            current_info.append(f"{property_type}s")  # "villas", "apartments"  
+        if location:
+            current_info.append(f"in {location}")
+        if budget_min:
+            budget_str = _format_budget_short(budget_min)
+            if budget_max:
+                budget_str += f"-{_format_budget_short(budget_max)}"
             current_info.append(f"budget {budget_str}")
         
         # Create contextual intro
@@ -572,22 +1121,15 @@ Rules:
             intro = f"Great! I see you're {', '.join(current_info)}. "
         
         # Smart question grouping strategy
-        if len(missing) >= 3 and not any(current_info):
-            # Initial conversation - ask core questions together
-            return "To find the perfect property for you, I need to know:\n\n1️⃣ Are you looking to *buy* or *rent*?\n2️⃣ Which area in Dubai? (Marina, Downtown, JBR, etc.)\n3️⃣ What type of property? (apartment, villa, studio, etc.)"
-        
-        elif len(missing) >= 2 and "property_type" in missing:
+        if len(missing) >= 2 and "property_type" in missing:
             # Ask remaining questions together
-            questions = []
-            for miss in missing:
-                if miss in clarification_map:
-                    questions.append(clarification_map[miss])
+            questions = [_CLARIFICATION_QUESTIONS[miss] for miss in missing if miss in _CLARIFICATION_QUESTIONS]
             
             if len(questions) <= 2:
                 return f"{intro}To find the perfect property, I need to know:\n\n• {questions[0]}\n• {questions[1] if len(questions) > 1 else ''}"
         
         # Single question for final missing item
-        question = clarification_map.get(missing[0], "Could you provide more details?")
+        question = _CLARIFICATION_QUESTIONS.get(missing[0], "Could you provide more details?")
         return f"{intro}To find the perfect property, I need to know: {question}"
     
     def _convert_to_search_params(self, requirements: UserRequirements) -> Dict[str, Any]:
@@ -602,9 +1144,9 @@ Rules:
         if requirements.location:
             location_lower = requirements.location.lower()
             # Skip location filter for flexible searches
-            if location_lower not in ["any", "anywhere", "all areas", "any location", "nearby", "nearby areas"]:
+            if location_lower not in _FLEXIBLE_LOCATIONS:
                 params['locality'] = requirements.location
-            elif location_lower in ["nearby", "nearby areas"]:
+            elif location_lower in _NEARBY_LOCATIONS:
                 # For nearby searches, don't set locality to allow broader search
                 logger.info(f"🌍 [LOCATION] Expanding search for nearby areas (removing location restriction)")
             
@@ -619,75 +1161,37 @@ Rules:
                     params['max_sale_price_aed'] = requirements.budget_max
         
         if requirements.property_type:
-            # Handle property type variations - match actual database values from your image
-            prop_type = requirements.property_type.lower()
-            if 'villa village' in prop_type:
-                params['property_type'] = 'Villa village'
-            elif 'villa' in prop_type:
-                params['property_type'] = 'Villa'
-            elif 'apartment' in prop_type or 'flat' in prop_type or 'bed' in prop_type:
-                params['property_type'] = 'Apartment'
-            elif 'penthouse' in prop_type:
-                params['property_type'] = 'Penthouse'
-            elif 'studio' in prop_type:
-                params['property_type'] = 'Studio'
+            # Handle property type variations - match actual database values
+            params['property_type'] = _canonical_property_type(requirements.property_type)
+            if params['property_type'] == 'Studio':
                 params['bedrooms'] = 0
-            elif 'townhouse' in prop_type or 'town house' in prop_type:
-                params['property_type'] = 'Townhouse'
-            elif 'residential' in prop_type:
-                params['property_type'] = 'Residential'
-            elif 'commercial' in prop_type:
-                params['property_type'] = 'Commercial'
-            elif 'plot' in prop_type:
-                params['property_type'] = 'Plot'
-            else:
-                # Default fallback - try the value as-is first
-                params['property_type'] = requirements.property_type.title()
         
         if requirements.bedrooms is not None:
             params['bedrooms'] = requirements.bedrooms
         
         # Debug logging
-        logger.info(f"🔍 [SEARCH_PARAMS] Generated search parameters: {params}")
-        logger.info(f"🔍 [REQUIREMENTS] From requirements: {requirements.dict()}")
+        logger.info("🔍 [SEARCH_PARAMS] Generated search parameters: %s", params)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 [REQUIREMENTS] From requirements: %s", requirements.model_dump())
         
         return params
     
-    def _convert_to_sophisticated_search_criteria(self, requirements: UserRequirements) -> SearchCriteria:
+    def _convert_to_sophisticated_search_criteria(self, requirements: UserRequirements) -> "SearchCriteria":
         """
         🚀 Convert AI-extracted requirements to SearchCriteria for sophisticated search
         """
+        from tools.sophisticated_search_pipeline import SearchCriteria
+        
         # Handle location filtering for sophisticated search
         location = requirements.location
         if requirements.location:
-            location_lower = requirements.location.lower()
-            if location_lower in ["any", "anywhere", "all areas", "any location", "nearby", "nearby areas"]:
+            if requirements.location.lower() in _FLEXIBLE_LOCATIONS:
                 location = None  # Let sophisticated search handle location flexibility
         
         # Normalize property type for sophisticated search
         property_type = None
         if requirements.property_type:
-            prop_type = requirements.property_type.lower()
-            if 'villa village' in prop_type:
-                property_type = 'Villa village'
-            elif 'villa' in prop_type:
-                property_type = 'Villa'
-            elif 'apartment' in prop_type or 'flat' in prop_type or 'bed' in prop_type:
-                property_type = 'Apartment'
-            elif 'penthouse' in prop_type:
-                property_type = 'Penthouse'
-            elif 'studio' in prop_type:
-                property_type = 'Studio'
-            elif 'townhouse' in prop_type or 'town house' in prop_type:
-                property_type = 'Townhouse'
-            elif 'residential' in prop_type:
-                property_type = 'Residential'
-            elif 'commercial' in prop_type:
-                property_type = 'Commercial'
-            elif 'plot' in prop_type:
-                property_type = 'Plot'
-            else:
-                property_type = requirements.property_type.title()
+            property_type = _canonical_property_type(requirements.property_type)
         
         # Create SearchCriteria object
         criteria = SearchCriteria(
@@ -699,7 +1203,8 @@ Rules:
             bedrooms=requirements.bedrooms
         )
         
-        logger.info(f"🧠 [SOPHISTICATED_SEARCH] Generated criteria: {criteria.to_dict()}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🧠 [SOPHISTICATED_SEARCH] Generated criteria: %s", criteria.to_dict())
         
         return criteria
     
@@ -708,18 +1213,44 @@ Rules:
         Extract current requirements from session
         """
         req_data = session.context.get('user_requirements', {})
-        return UserRequirements(**req_data)
+        
+        # Reuse the parsed model while the stored dict is the one it was built from
+        cached = session.context.get('_requirements_model')
+        if cached is not None and cached[0] is req_data:
+            return cached[1]
+        
+        # The dict is always our own model_dump() output, so validation can be skipped
+        requirements = UserRequirements.model_construct(**req_data)
+        session.context['_requirements_model'] = (req_data, requirements)
+        return requirements
     
     def _save_requirements_to_session(self, session: ConversationSession, requirements: UserRequirements):
         """
         Save requirements to session
         """
-        session.context['user_requirements'] = requirements.dict()
+        # Unchanged requirements (same model, or an equal copy) are a no-op - no dump, no timestamp bump
+        cached = session.context.get('_requirements_model')
+        if (cached is not None
+                and cached[0] is session.context.get('user_requirements')
+                and (cached[1] is requirements or cached[1] == requirements)):
+            return
+        
+        req_data = requirements.model_dump()
+        session.context['user_requirements'] = req_data
+        session.context['_requirements_model'] = (req_data, requirements)
         session.context['last_updated'] = time.time()
     
-    async def _generate_property_specific_response(self, message: str, session: ConversationSession) -> str:
+    async def _generate_property_specific_response(
+        self,
+        message: str,
+        session: ConversationSession,
+        intent_analysis: Optional[Dict[str, Any]] = None,
+        prefetched_details: Optional[asyncio.Task] = None
+    ) -> str:
         """
         Generate response about specific properties with smart active property management
+        intent_analysis from process_message is reused so the turn makes one intent call, not two;
+        prefetched_details is a details fetch for the active property already started by process_message
         """
         active_properties = session.context.get('active_properties', [])
         active_property_id = session.context.get('active_property_id')
@@ -727,22 +1258,23 @@ Rules:
         if not active_properties:
             return "I'd be happy to help! Could you clarify what you'd like to know about the properties?"
         
+        # Lowercase once for all keyword checks below
+        message_lower = _lowercase(message).strip()
+        
         # STEP 1: Check if user wants to switch to other properties or clear context
-        switch_intent = self._detect_property_switch_intent(message)
+        switch_intent = self._detect_property_switch_intent(message_lower)
         if switch_intent.get("wants_other_properties"):
             logger.info("🔄 User asking about other properties - clearing active property context")
             session.context['active_property_id'] = None
             return switch_intent.get("response", "Let me help you with other properties. Which specific property would you like to know about?")
         
         # STEP 2: Check if user is referencing a specific property by number/name
-        property_reference = self._extract_property_reference(message)
+        property_reference = self._extract_property_reference(message_lower)
         if property_reference:
             logger.info(f"🎯 User referenced specific property: {property_reference}")
             
             # Get specific property details
-            from utils.session_manager import SessionManager
-            session_manager = SessionManager()
-            specific_property = session_manager.get_property_by_reference(session.user_id, property_reference)
+            specific_property = self._session_manager.get_property_by_reference(session.user_id, property_reference)
             
             if specific_property:
                 # UPDATE ACTIVE PROPERTY: Set this as the new active property
@@ -752,7 +1284,7 @@ Rules:
                     logger.info(f"🔄 Updated active property to: {new_property_id}")
                 
                 # Format and return detailed property information
-                return self._format_property_details(specific_property, property_reference)
+                return self._format_property_details(specific_property, property_reference, session)
             else:
                 # Property reference not found
                 return f"I couldn't find property {property_reference} in our current results. Could you specify which property you're interested in? We found {len(active_properties)} properties for you."
@@ -761,20 +1293,23 @@ Rules:
         if active_property_id:
             logger.info(f"🏠 Using active property {active_property_id} for query: '{message}'")
             
-            # Get active property details
-            from tools.property_details_tool import property_details_tool
-            active_property_data = await property_details_tool.get_property_details(active_property_id)
+            # Get active property details - overlapped with intent analysis when this turn has none to reuse
+            if intent_analysis is None:
+                active_property_data, intent_analysis = await asyncio.gather(
+                    property_details_tool.get_property_details(active_property_id),
+                    self._analyze_user_intent(message, session)
+                )
+            elif prefetched_details is not None:
+                active_property_data = await prefetched_details
+            else:
+                active_property_data = await property_details_tool.get_property_details(active_property_id)
             
             if active_property_data:
                 # Use AI to understand intent instead of manual detection
-                intent_analysis = await self._analyze_user_intent(message, session)
-                
                 if intent_analysis.get("is_location_request"):
                     logger.info(f"🗺️ AI detected location request for active property: {active_property_id}")
                     
                     # Use Smart Location Assistant for comprehensive location handling
-                    from tools.smart_location_assistant import smart_location_assistant
-                    
                     # Extract user phone from session
                     user_phone = session.user_id.replace('+', '')  # Remove + if present
                     whatsapp_account = session.context.get('whatsapp_business_account', '543107385407043')
@@ -797,188 +1332,187 @@ Rules:
         # STEP 4: No active property or specific reference - general property question
         return await self._generate_general_property_response(message, active_properties)
     
-    def _detect_property_switch_intent(self, message: str) -> Dict[str, Any]:
+    def _detect_property_switch_intent(self, message_lower: str) -> Dict[str, Any]:
         """
         Detect if user wants to switch to other properties or clear current context
+        Expects the already lowercased, stripped message
         """
-        message_lower = message.lower().strip()
+        if _OTHER_PROPERTIES_RE.search(message_lower):
+            return {
+                "wants_other_properties": True,
+                "response": f"Sure! Let me show you other properties. You can ask about any specific property by saying 'Tell me about property 2' or 'Show me property details'. Which property would you like to explore?"
+            }
         
-        # Keywords that indicate wanting to see other properties
-        other_keywords = [
-            'other properties', 'different properties', 'show me others', 'other options',
-            'see more', 'what else', 'alternatives', 'other ones', 'different ones',
-            'show other', 'more properties', 'other listings'
-        ]
+        if _BROWSE_PROPERTIES_RE.search(message_lower):
+            return {
+                "wants_other_properties": True,
+                "response": f"I can help you browse all the properties. Which specific property number would you like to know more about? (e.g., 'property 1', 'property 2', etc.)"
+            }
         
-        # Keywords that indicate general browsing (not specific to current property)
-        general_keywords = [
-            'show me all', 'list properties', 'list all properties', 'what properties', 'available properties',
-            'all options', 'browse properties', 'property list'
-        ]
+        return {"wants_other_properties": False}
+    
+    def _quick_intent_classify(
+        self,
+        message_lower: str,
+        has_active_properties: bool,
+        has_active_property_id: bool,
+        has_pagination_context: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Classify whole-message greetings, "show more", "property N" and location asks without the LLM
+        Returns None whenever the message could mean anything else
+        """
+        has_context = has_active_properties or has_active_property_id
+        
+        if has_pagination_context and _PAGINATION_ONLY_RE.fullmatch(message_lower):
+            category = "pagination"
+        elif has_active_properties and _PROPERTY_REF_ONLY_RE.fullmatch(message_lower):
+            category = "property_details"
+        elif has_active_property_id and _LOCATION_ONLY_RE.fullmatch(message_lower):
+            category = "location"
+        elif _GREETING_ONLY_RE.fullmatch(message_lower):
+            category = "general"
+        else:
+            return None
         
-        for keyword in other_keywords:
-            if keyword in message_lower:
-                return {
-                    "wants_other_properties": True,
-                    "response": f"Sure! Let me show you other properties. You can ask about any specific property by saying 'Tell me about property 2' or 'Show me property details'. Which property would you like to explore?"
-                }
+        return {
+            "is_fresh_search": False,
+            "is_location_request": category == "location",
+            "is_property_question": category == "property_details",
+            "is_continuing_conversation": has_context,
+            "is_pagination_request": category == "pagination",
+            "intent_category": category,
+            "confidence": 0.95
+        }
+    
+    def _quick_search_intent(
+        self,
+        message: str,
+        current_requirements: UserRequirements,
+        has_context: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Classify messages made up entirely of search criteria without the LLM
+        Only a change to a current requirement is decided here (the prompt's fresh-search rule); anything else returns None
+        """
+        fields, coverage = _regex_extract(message)
+        if not fields or coverage < _FAST_EXTRACT_MIN_COVERAGE:
+            return None
         
-        for keyword in general_keywords:
-            if keyword in message_lower:
+        for key, value in fields.items():
+            if key.startswith('confidence_'):
+                continue
+            current = getattr(current_requirements, key)
+            if isinstance(value, str) and isinstance(current, str):
+                changed = value.lower() != current.lower()
+            else:
+                changed = value != current
+            if changed:
                 return {
-                    "wants_other_properties": True,
-                    "response": f"I can help you browse all the properties. Which specific property number would you like to know more about? (e.g., 'property 1', 'property 2', etc.)"
+                    "is_fresh_search": True,
+                    "is_location_request": False,
+                    "is_property_question": False,
+                    "is_continuing_conversation": has_context,
+                    "is_pagination_request": False,
+                    "intent_category": "search",
+                    "confidence": _FAST_EXTRACT_CONFIDENCE
                 }
+        return None
+    
+    async def _request_intent(self, context_info: str) -> Dict[str, Any]:
+        """
+        Run the intent LLM call for a per-turn prompt and cache the verdict
+        """
+        response = await self._chat_completion(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": _INTENT_SYSTEM_PROMPT},
+                {"role": "user", "content": context_info}
+            ],
+            response_format=_INTENT_RESPONSE_FORMAT,
+            temperature=0.1,
+            max_tokens=120  # the 7-field flat JSON answer is ~70 tokens
+        )
+        self._log_prompt_cache_usage("intent", response)
         
-        return {"wants_other_properties": False}
+        analysis = fast_json.loads(response.choices[0].message.content)
+        logger.info("🧠 AI Intent Analysis: %s", analysis)
+        
+        self._intent_cache[context_info] = analysis
+        return analysis
     
     async def _analyze_user_intent(self, message: str, session: ConversationSession) -> Dict[str, Any]:
         """
         INTELLIGENT AI-based intent analysis instead of stupid regex patterns
         """
         try:
-            # Get current context
-            has_active_properties = bool(session.context.get('active_properties'))
-            has_active_property_id = bool(session.context.get('active_property_id'))
-            current_stage = session.context.get('conversation_stage', ConversationStage.USER_INITIATED)
+            # Get current context in one pass over a local (empty tuple default avoids a list per call)
+            context = session.context
+            has_active_properties = bool(context.get('active_properties'))
+            has_active_property_id = bool(context.get('active_property_id'))
+            current_stage = context.get('conversation_stage', ConversationStage.USER_INITIATED)
             
             # Check pagination context
-            all_available_properties = session.context.get('all_available_properties', [])
-            properties_shown = session.context.get('properties_shown', 0)
+            all_available_properties = context.get('all_available_properties') or ()
+            properties_shown = context.get('properties_shown', 0)
             has_pagination_context = bool(all_available_properties and len(all_available_properties) > properties_shown)
             
+            # Unambiguous short messages are classified locally - no prompt building, no round trip
+            quick = self._quick_intent_classify(
+                _lowercase(message).strip(), has_active_properties, has_active_property_id, has_pagination_context
+            )
+            if quick is not None:
+                logger.info("⚡ [QUICK_INTENT] %s", quick["intent_category"])
+                return quick
+            
             # Get current user requirements for context
             current_requirements = self._get_requirements_from_session(session)
             
-            context_info = f"""
-Current conversation context:
-- Stage: {current_stage}  
-- Has active properties: {has_active_properties}
-- Has active property selected: {has_active_property_id}
-- Previous interactions: {"Yes" if has_active_properties else "No"}
-- PAGINATION CONTEXT: {len(all_available_properties)} total properties available, {properties_shown} already shown
-- Can show more properties: {has_pagination_context}
-
-CURRENT USER REQUIREMENTS:
-- Transaction Type: {current_requirements.transaction_type or "Not specified"}
-- Location: {current_requirements.location or "Not specified"} 
-- Property Type: {current_requirements.property_type or "Not specified"}
-- Budget: {f"{current_requirements.budget_min}-{current_requirements.budget_max}" if current_requirements.budget_min or current_requirements.budget_max else "Not specified"}
-"""
-
-            analysis_prompt = f"""
-You are analyzing user intent in a real estate conversation. Based on the context and user message, determine the user's intent.
-
-{context_info}
-
-User message: "{message}"
-
-IMPORTANT: If there's an active property selected, determine if the user's message is actually ABOUT that specific property or just a general question. Only set is_property_question=true if they're asking about details, features, or actions related to the specific selected property.
-
-Examples of property-specific questions: "How many bathrooms?", "Is parking included?", "Can I see photos?", "What floor is it on?"
-Examples of general questions: "Hello", "What's the weather?", "How are you?", "Tell me about Dubai", "What other properties do you have?"
-
-Analyze and return JSON with:
-{{
-    "is_fresh_search": boolean,  // true if user wants to start a new property search
-    "is_location_request": boolean,  // true if asking about location/map/directions/nearby places
-    "is_property_question": boolean,  // true if asking about specific property details
-    "is_continuing_conversation": boolean,  // true if following up on existing conversation
-    "is_pagination_request": boolean,  // true if asking for more properties (show more, next batch, etc.)
-    "intent_category": "search|location|property_details|followup|pagination|general",
-    "confidence": float  // 0-1 how confident you are
-}}
-
-CRITICAL ANALYSIS RULES - COMPARE CURRENT vs NEW:
-
-1. **LOCATION CHANGE DETECTION**:
-   - CURRENT LOCATION: {current_requirements.location or "None"}
-   - If user mentions ANY different location → is_fresh_search = true
-   - Examples: "options in al Barsha", "what about JBR", "properties in Marina"
-   - If current is "Marina" and user says "al Barsha" → NEW SEARCH
-   - If current is "JBR" and user says "Downtown" → NEW SEARCH
-
-2. **BUDGET CHANGE DETECTION**:
-   - CURRENT BUDGET: {f"{current_requirements.budget_min or 'None'} - {current_requirements.budget_max or 'None'}" if current_requirements.budget_min or current_requirements.budget_max else "None"}
-   - If user mentions different budget → is_fresh_search = true
-   - Examples: "increase budget to 150k", "change budget", "under 80k", "1M budget"
-   - If current is "100k max" and user says "150k" → NEW SEARCH
-   - If current is "None" and user says "80k budget" → NEW SEARCH
-
-3. **PROPERTY TYPE CHANGE DETECTION**:
-   - CURRENT PROPERTY TYPE: {current_requirements.property_type or "None"}
-   - If user mentions different property type → is_fresh_search = true  
-   - Examples: "show me villas instead", "apartments", "townhouses", "studios"
-   - If current is "Apartment" and user says "villas" → NEW SEARCH
-   - If current is "Villa" and user says "apartments" → NEW SEARCH
-
-4. **TRANSACTION TYPE CHANGE DETECTION**:
-   - CURRENT TRANSACTION: {current_requirements.transaction_type or "None"}
-   - If user mentions different transaction → is_fresh_search = true
-   - Examples: "I want to buy now", "switch to rent", "looking to purchase"
-   - If current is "rent" and user says "buy" → NEW SEARCH
-   - If current is "buy" and user says "rent" → NEW SEARCH
-
-5. **PAGINATION DETECTION**:
-   - "show more", "more properties", "next batch" → is_pagination_request = true, is_fresh_search = false
-   - Handle typos: "shoe more", "more prop" → still pagination
-
-6. **PROPERTY DETAILS**:
-   - Asking about specific properties → is_property_question = true, is_fresh_search = false
-
-7. **LOCATION SERVICES**:
-   - "nearest hospital", "send map", "directions", "share location", "send brochure", "brochure" → is_location_request = true, is_fresh_search = false
-
-**BE SMART**: Don't rely on keywords. Understand INTENT. If user is clearly asking about a different location than current context, it's a fresh search!
-
-Be intelligent - understand context and intent, don't rely on keywords! Handle typos gracefully.
-"""
-
-            response = await self.openai.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": analysis_prompt}],
-                response_format={"type": "json_object"},
-                temperature=0.1,
-                max_tokens=200
+            # Pure search specs ("2BR villa in JBR under 3M") that change a requirement are new searches
+            quick = self._quick_search_intent(message, current_requirements, has_active_properties or has_active_property_id)
+            if quick is not None:
+                logger.info("⚡ [QUICK_INTENT] fresh search")
+                return quick
+            
+            budget_str = f"{current_requirements.budget_min or 'None'} - {current_requirements.budget_max or 'None'}" if current_requirements.budget_min or current_requirements.budget_max else "None"
+            
+            context_info = (
+                f"Stage: {current_stage}\n"
+                f"Active properties: {has_active_properties}; property selected: {has_active_property_id}\n"
+                f"Pagination: {properties_shown} of {len(all_available_properties)} shown, can show more: {has_pagination_context}\n"
+                f"CURRENT: transaction={current_requirements.transaction_type or 'None'}, "
+                f"location={current_requirements.location or 'None'}, "
+                f"property_type={current_requirements.property_type or 'None'}, budget={budget_str}\n"
+                f'User message: "{message}"'
             )
+
+            # The prompt captures everything the answer depends on, so it is the cache key
+            cached = self._intent_cache.get(context_info)
+            if cached is not None:
+                logger.info("💾 [INTENT_CACHE] hit: %s", cached.get("intent_category"))
+                return dict(cached)
             
-            analysis = json.loads(response.choices[0].message.content)
-            logger.info(f"🧠 AI Intent Analysis: {analysis}")
-            
-            return analysis
+            # Identical prompts already in flight (e.g. a redelivered webhook) share one call
+            if context_info in self._intent_requests:
+                logger.info("🔗 [INTENT_INFLIGHT] joining pending analysis")
+            return dict(await shared_task(self._intent_requests, context_info, lambda: self._request_intent(context_info)))
             
         except Exception as e:
             logger.error(f"❌ AI intent analysis failed: {e}")
             
             # Smart fallback logic - don't assume everything is property-related just because there's an active property
-            message_lower = message.lower()
-            
-            # Property-specific keywords that indicate the user is asking about the active property
-            property_keywords = [
-                'bathroom', 'bedroom', 'kitchen', 'balcony', 'parking', 'pool', 'gym', 'garden',
-                'floor', 'sqft', 'square', 'size', 'area', 'furnish', 'view', 'direction',
-                'price', 'rent', 'sale', 'photo', 'image', 'visit', 'showing', 'available',
-                'feature', 'amenity', 'include', 'detail', 'spec', 'when built', 'age',
-                'maintenance', 'chiller', 'dewa', 'utilities'
-            ]
-            
-            # General greeting/conversation keywords
-            general_keywords = [
-                'hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening',
-                'how are you', 'thank you', 'thanks', 'weather', 'dubai', 'tell me about',
-                'what other', 'show me more', 'different', 'other options'
-            ]
+            message_lower = _lowercase(message)
             
             # Determine if this is likely a property question or general question
-            is_likely_property_question = has_active_property_id and any(keyword in message_lower for keyword in property_keywords)
-            is_likely_general_question = any(keyword in message_lower for keyword in general_keywords)
+            is_likely_property_question = has_active_property_id and bool(_PROPERTY_QUESTION_RE.search(message_lower))
+            is_likely_general_question = bool(_GENERAL_CHAT_RE.search(message_lower))
             
             # If it's clearly general, don't treat as property question even with active property
             is_property_question = is_likely_property_question and not is_likely_general_question
             
             return {
                 "is_fresh_search": not (has_active_properties or has_active_property_id),
-                "is_location_request": any(word in message_lower for word in ['location', 'where', 'map', 'nearest', 'nearby']),
+                "is_location_request": bool(_LOCATION_REQUEST_RE.search(message_lower)),
                 "is_property_question": is_property_question,
                 "is_continuing_conversation": has_active_properties or has_active_property_id,
                 "intent_category": "property_details" if is_property_question else "general",
@@ -992,8 +1526,8 @@ Be intelligent - understand context and intent, don't rely on keywords! Handle t
         """
         try:
             # Special handling for name questions
-            message_lower = message.lower()
-            if any(phrase in message_lower for phrase in ['what is my name', "what's my name", 'my name is', 'i am', "i'm"]):
+            message_lower = _lowercase(message)
+            if _NAME_PHRASE_RE.search(message_lower):
                 # Get user name from session context
                 user_name = session.context.get('user_name')
                 
@@ -1005,16 +1539,9 @@ Be intelligent - understand context and intent, don't rely on keywords! Handle t
                         brief_answer = "I don't have your name on record yet. Feel free to tell me!"
                 elif 'my name is' in message_lower or 'i am' in message_lower or "i'm" in message_lower:
                     # User telling us their name - extract it
-                    import re
-                    name_patterns = [
-                        r'my name is (\w+)', 
-                        r"i'?m (\w+)", 
-                        r'i am (\w+)'
-                    ]
-                    
                     extracted_name = None
-                    for pattern in name_patterns:
-                        match = re.search(pattern, message_lower)
+                    for pattern in _NAME_PATTERNS:
+                        match = pattern.search(message_lower)
                         if match:
                             extracted_name = match.group(1).title()
                             break
@@ -1029,28 +1556,10 @@ Be intelligent - understand context and intent, don't rely on keywords! Handle t
                     brief_answer = "Thanks for your message!"
             else:
                 # Generate a brief answer to other general questions using AI
-                response_prompt = f"""
-You are a helpful real estate assistant. The user asked: "{message}"
-
-This appears to be a general question (not about a specific property). Provide a brief, helpful answer in 1-2 sentences. Keep it concise and friendly.
-
-Examples:
-- "Hello" → "Hi there! I'm here to help you with your property search."
-- "How are you?" → "I'm doing great, thanks for asking!"  
-- "Tell me about Dubai" → "Dubai is an amazing city with world-class amenities and diverse neighborhoods."
-- "What's the weather like?" → "Dubai generally has sunny, warm weather year-round."
-
-Give a brief, natural response:
-"""
-                
                 try:
-                    ai_response = await self.openai.chat.completions.create(
-                        model=self.model,
-                        messages=[{"role": "user", "content": response_prompt}],
-                        temperature=0.7,
-                        max_tokens=100
+                    brief_answer = await self._stream_text_completion(
+                        "general_question", _GENERAL_QUESTION_SYSTEM_PROMPT, message, temperature=0.7, max_tokens=100
                     )
-                    brief_answer = ai_response.choices[0].message.content.strip()
                 except:
                     # Fallback for general responses
                     brief_answer = "Thanks for your question!"
@@ -1088,52 +1597,25 @@ Give a brief, natural response:
             bedrooms = property_data.get('bedrooms', 0)
             title = property_data.get('title', '') or property_data.get('building_name', '')
             price = property_data.get('sale_price_aed') or property_data.get('rent_price_aed')
+            price_str = _format_aed(price) if price else 'Contact for price'
             
-            address = property_data.get('address', {})
-            if isinstance(address, str):
-                try:
-                    import json
-                    address = json.loads(address)
-                except:
-                    address = {}
-            
-            locality = address.get('locality', 'Dubai') if address else 'Dubai'
+            address = _parse_address(property_data)
+            locality = address.get('locality', 'Dubai') if isinstance(address, dict) and address else 'Dubai'
             
             # Build context-rich prompt
-            property_context = f"""
-Property Details:
-- Type: {bedrooms}BR {property_type}
-- Title: {title}
-- Location: {locality}
-- Price: AED {price:,} if price else 'Contact for price'
-"""
-            
-            response_prompt = f"""
-You are a helpful property assistant. Answer the user's question about this specific property directly and naturally.
-
-{property_context}
-
-User question: "{message}"
-
-IMPORTANT RULES:
-- Answer directly and naturally like a helpful assistant
-- Do NOT use formal letter templates or signatures  
-- Do NOT include placeholders like "[Your Name]" or "[Contact Information]"
-- Keep responses conversational and friendly
-- If you don't have specific information, just say so and offer to help get more details
-- End with a helpful question or suggestion about next steps
-
-Provide a helpful, natural response:"""
-            
-            response = await self.openai.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": response_prompt}],
-                temperature=0.7,
-                max_tokens=200
+            response_prompt = _PROPERTY_RESPONSE_TEMPLATE.format_map({
+                'bedrooms': bedrooms,
+                'property_type': property_type,
+                'title': title,
+                'locality': locality,
+                'price': price_str,
+                'message': message,
+            })
+            
+            return await self._stream_text_completion(
+                "contextual_property", _PROPERTY_RESPONSE_SYSTEM_PROMPT, response_prompt, temperature=0.7, max_tokens=200
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
             logger.error(f"❌ Contextual property response failed: {e}")
             # Fallback to basic property details formatting
@@ -1144,89 +1626,91 @@ Provide a helpful, natural response:"""
         Generate response for general property questions when no active property is set
         """
         try:
-            response_prompt = f"""
-User is asking about properties they were shown. Generate a helpful response.
-
-User question: "{message}"
-Number of properties shown: {len(active_properties)}
-
-Generate a concise, helpful response. Guide them to ask about specific properties by number (e.g., "Tell me about property 1") or ask about specific aspects they want to know.
-"""
+            response_prompt = f'Properties shown: {len(active_properties)}\nQuestion: "{message}"'
             
-            response = await self.openai.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": response_prompt}],
-                temperature=0.7,
-                max_tokens=150
+            return await self._stream_text_completion(
+                "general_property", _GENERAL_PROPERTY_SYSTEM_PROMPT, response_prompt, temperature=0.7, max_tokens=150
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
             logger.error(f"❌ General property response generation failed: {e}")
             return f"I'd be happy to help with your question about the properties. You can ask about specific properties by saying 'Tell me about property 1' or ask about specific details you'd like to know. We found {len(active_properties)} properties for you."
     
-    def _extract_property_reference(self, message: str) -> Optional[str]:
+    def _extract_property_reference(self, message_lower: str) -> Optional[str]:
         """
         Extract property reference from user message (e.g., "property 1", "first one", "2nd property")
         FIXED: Don't match numbers that are clearly budget amounts or other contexts
+        Expects the already lowercased, stripped message
         """
-        import re
-        
-        message_lower = message.lower().strip()
-        
         # EXCLUDE budget/price contexts - these are NOT property references
-        budget_contexts = [
-            'budget', 'price', 'cost', 'aed', 'million', 'thousand', 'k', 'm',
-            'increase', 'decrease', 'change', 'set', 'my budget', 'the budget'
-        ]
-        
-        # If message contains budget/price context, don't extract property numbers
-        if any(context in message_lower for context in budget_contexts):
-            logger.info(f"🚫 Skipping property reference extraction - budget/price context detected: {message}")
+        if _BUDGET_CONTEXT_RE.search(message_lower):
+            logger.info(f"🚫 Skipping property reference extraction - budget/price context detected: {message_lower}")
             return None
         
-        # Pattern 1: "property 1", "property #1", "property number 1"
-        match = re.search(r'property\s*(?:number\s*|#\s*)?(\d+)', message_lower)
-        if match:
-            return match.group(1)
+        # Patterns 1, 2 and 4 need a digit - most WhatsApp messages have none, so skip them cheaply
+        has_digit = _DIGIT_RE.search(message_lower) is not None
+        has_property_context = None  # scanned only when a pattern needs it
         
-        # Pattern 2: "1st", "2nd", "3rd", etc. (but only in property context)
-        if any(word in message_lower for word in ['property', 'apartment', 'villa', 'listing']):
-            match = re.search(r'(\d+)(?:st|nd|rd|th)', message_lower)
+        if has_digit:
+            # Pattern 1: "property 1", "property #1", "property number 1"
+            match = _PROPERTY_NUM_RE.search(message_lower)
             if match:
                 return match.group(1)
+            
+            # Pattern 2: "1st", "2nd", "3rd", etc. (but only in property context)
+            has_property_context = _PROPERTY_CONTEXT_RE.search(message_lower) is not None
+            if has_property_context:
+                match = _ORDINAL_NUM_RE.search(message_lower)
+                if match:
+                    return match.group(1)
         
         # Pattern 3: "first", "second", "third" (but only in property context)
-        if any(word in message_lower for word in ['property', 'apartment', 'villa', 'listing', 'one', 'option']):
-            ordinal_words = {
-                'first': '1', 'second': '2', 'third': '3', 'fourth': '4', 'fifth': '5'
-            }
-            for word, num in ordinal_words.items():
-                if word in message_lower:
-                    return num
-        
-        # Pattern 4: "tell me about 1", "details of 2" (explicit property context)
-        property_context_patterns = [
-            r'tell me about\s+(\d+)',
-            r'details of\s+(\d+)', 
-            r'more about\s+(\d+)',
-            r'property\s+(\d+)',
-            r'option\s+(\d+)'
-        ]
-        
-        for pattern in property_context_patterns:
-            match = re.search(pattern, message_lower)
-            if match:
+        # Look for the ordinal word first - it is the rarer condition, so most messages stop after one scan
+        match = _ORDINAL_WORD_RE.search(message_lower)
+        if match:
+            if has_property_context is None:
+                has_property_context = _PROPERTY_CONTEXT_RE.search(message_lower) is not None
+            if has_property_context or _ONE_OPTION_RE.search(message_lower):
+                return _ORDINAL_WORDS[match.group(0)]
+        
+        if has_digit:
+            # Pattern 4: "tell me about 1", "details of 2" (explicit property context)
+            for match in _PROPERTY_CONTEXT_NUM_RE.finditer(message_lower):
                 num = int(match.group(1))
                 if 1 <= num <= 20:  # Reasonable range for property references
                     return str(num)
         
         return None
     
-    def _format_property_details(self, property_data: Dict[str, Any], reference: str) -> str:
+    def _format_property_details(
+        self, property_data: Dict[str, Any], reference: str, session: Optional[ConversationSession] = None
+    ) -> str:
+        """
+        Format detailed property information for WhatsApp, reusing the session's text for a property asked about again
+        """
+        # Texts belong to the current results list and are dropped as soon as the search results are replaced
+        details_by_reference = None
+        if session is not None:
+            active_properties = session.context.get('active_properties')
+            cached = session.context.get('_property_details')
+            if cached is None or cached[0] is not active_properties:
+                cached = (active_properties, {})
+                session.context['_property_details'] = cached
+            details_by_reference = cached[1]
+            entry = details_by_reference.get(reference)
+            if entry is not None and entry[0] is property_data:
+                return entry[1]
+        
+        details = self._render_property_details(property_data, reference)
+        if details is None:
+            return f"I have the details for property {reference}, but there was an issue formatting them. Let me know what specific information you'd like to know!"
+        if details_by_reference is not None:
+            details_by_reference[reference] = (property_data, details)
+        return details
+    
+    def _render_property_details(self, property_data: Dict[str, Any], reference: str) -> Optional[str]:
         """
-        Format detailed property information for WhatsApp
+        Build the details message; None when the property data can't be formatted
         """
         try:
             # Handle different property data structures
@@ -1248,18 +1732,12 @@ Generate a concise, helpful response. Guide them to ask about specific propertie
             # Format price
             price_str = "Price on request"
             if prop.get('sale_price_aed'):
-                price_str = f"AED {prop['sale_price_aed']:,}"
+                price_str = _format_aed(prop['sale_price_aed'])
             elif prop.get('rent_price_aed'):
-                price_str = f"AED {prop['rent_price_aed']:,}/year"
+                price_str = _format_aed(prop['rent_price_aed'], per_year=True)
             
             # Extract location
-            address = prop.get('address', {})
-            if isinstance(address, str):
-                try:
-                    import json
-                    address = json.loads(address)
-                except:
-                    address = {}
+            address = _parse_address(prop)
             
             location = "Dubai"
             if isinstance(address, dict):
@@ -1272,50 +1750,30 @@ Generate a concise, helpful response. Guide them to ask about specific propertie
             if building_name:
                 location = f"{building_name}, {location}"
             
-            # Format size
-            size_str = ""
-            if prop.get('bua_sqft'):
-                size_str = f"📐 {prop['bua_sqft']:,} sqft"
-            
             # Extract features
-            features = []
-            if prop.get('study'):
-                features.append("study")
-            if prop.get('maid_room'):
-                features.append("maid room")
-            if prop.get('landscaped_garden'):
-                features.append("garden")
+            features = [label for key, label in _FLAG_FEATURES if prop.get(key)]
             if prop.get('covered_parking_spaces') or prop.get('covered_parking'):
                 parking = prop.get('covered_parking_spaces') or prop.get('covered_parking', 1)
                 features.append(f"{parking} parking")
             if prop.get('park_pool_view'):
                 features.append("pool/park view")
             
-            features_str = ""
-            if features:
-                features_str = f"✨ {' • '.join(features)}"
-            
             # Format response
-            response = f"""🏠 **Property {reference} Details:**
-
-🏢 *{bedrooms}BR {property_type}*
-💰 {price_str}
-📍 {location}
-🚿 {bathrooms} bathroom{'s' if bathrooms != 1 else ''}"""
-            
-            if size_str:
-                response += f"\n{size_str}"
-            
-            if features_str:
-                response += f"\n{features_str}"
-            
-            response += "\n\n📞 Would you like to book a viewing or need more information about this property?"
-            
-            return response
+            return _PROPERTY_DETAILS_TEMPLATE.format_map({
+                'reference': reference,
+                'bedrooms': bedrooms,
+                'property_type': property_type,
+                'price': price_str,
+                'location': location,
+                'bathrooms': bathrooms,
+                'plural': _PLURAL_SUFFIX[bathrooms != 1],
+                'size_block': f"\n📐 {prop['bua_sqft']:,} sqft" if prop.get('bua_sqft') else '',
+                'features_block': f"\n✨ {' • '.join(features)}" if features else '',
+            })
             
         except Exception as e:
             logger.error(f"❌ Property formatting error: {e}")
-            return f"I have the details for property {reference}, but there was an issue formatting them. Let me know what specific information you'd like to know!"
+            return None
     
     async def execute_sophisticated_search_and_respond(self, criteria_dict: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
         """
@@ -1330,20 +1788,24 @@ Generate a concise, helpful response. Guide them to ask about specific propertie
         Returns:
             Tuple of (intelligent_response_message, property_objects_for_carousel)
         """
+        from tools.sophisticated_search_pipeline import sophisticated_search_pipeline, SearchCriteria
+        from tools.sophisticated_response_generator import generate_sophisticated_response
+        
         try:
             # Convert dict back to SearchCriteria object
             criteria = SearchCriteria(**criteria_dict)
             
-            logger.info(f"🧠 Executing sophisticated search with criteria: {criteria.to_dict()}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("🧠 Executing sophisticated search with criteria: %s", criteria.to_dict())
             
             # Execute sophisticated search
             search_result = await sophisticated_search_pipeline.search_with_intelligence(criteria, limit=15)
             
-            logger.info(f"🎯 Sophisticated search completed:")
-            logger.info(f"   Tier: {search_result.tier.value}")
-            logger.info(f"   Strategy: {search_result.strategy_used}")
-            logger.info(f"   Properties found: {search_result.count}")
-            logger.info(f"   Execution time: {search_result.execution_time_ms:.0f}ms")
+            logger.info("🎯 Sophisticated search completed:")
+            logger.info("   Tier: %s", search_result.tier.value)
+            logger.info("   Strategy: %s", search_result.strategy_used)
+            logger.info("   Properties found: %s", search_result.count)
+            logger.info("   Execution time: %.0fms", search_result.execution_time_ms)
             
             # CRITICAL FIX: Reorder properties by priority BEFORE generating response
             # This ensures response analysis and carousel properties match
@@ -1382,99 +1844,69 @@ What would you like to try?"""
         Reorder properties by priority: budget increase first, then location expansion, then property type
         """
         try:
-            if not alternatives_found or not criteria:
+            if not alternatives_found or not criteria or len(properties) <= 1:
                 return properties
             
             budget_max = getattr(criteria, 'budget_max', None) or getattr(criteria, 'budget_min', None)
             original_location = getattr(criteria, 'location', None)
             original_property_type = getattr(criteria, 'property_type', None)
+            if not budget_max and not original_location and not original_property_type:
+                # Nothing to compare against - every property would land in the "other" bucket
+                return properties
+            original_location_lower = original_location.lower() if original_location else None
+            original_type_lower = original_property_type.lower() if original_property_type else None
             
-            budget_properties = []
-            location_properties = []
-            property_type_properties = []
-            other_properties = []
+            # Priority buckets: budget increase, location expansion, property type expansion, everything else
+            buckets = ([], [], [], [])
             
             for prop in properties:
-                prop_price = self._get_property_price(prop)
-                prop_location = self._get_property_location(prop)
-                prop_type = self._get_property_type(prop)
-                
-                # Priority 1: Budget increase properties (price above original budget)
-                if budget_max and prop_price and prop_price > budget_max:
-                    # Check if it's in original location (budget increase, not location change)
-                    if original_location and prop_location and original_location.lower() in prop_location.lower():
-                        budget_properties.append(prop)
-                        continue
-                
-                # Priority 2: Location expansion properties (different location, within budget considerations)
-                if (original_location and prop_location and 
-                    original_location.lower() not in prop_location.lower()):
-                    location_properties.append(prop)
-                    continue
+                prop_price, prop_location, prop_type = self._extract_prop_fields(prop)
+                # None when either side is missing, otherwise whether the property is in the original location
+                in_original_location = (
+                    original_location_lower in prop_location.lower()
+                    if original_location_lower and prop_location else None
+                )
                 
-                # Priority 3: Property type expansion (different property type)
-                if (original_property_type and prop_type and 
-                    prop_type.lower() != original_property_type.lower()):
-                    property_type_properties.append(prop)
-                    continue
-                
-                # Everything else
-                other_properties.append(prop)
-            
-            # Combine in priority order
-            ordered_properties = budget_properties + location_properties + property_type_properties + other_properties
+                if budget_max and prop_price and prop_price > budget_max and in_original_location:
+                    # Priority 1: Budget increase (price above original budget, same location)
+                    priority = 0
+                elif in_original_location is False:
+                    # Priority 2: Location expansion (different location)
+                    priority = 1
+                elif original_type_lower and prop_type and prop_type.lower() != original_type_lower:
+                    # Priority 3: Property type expansion (different property type)
+                    priority = 2
+                else:
+                    priority = 3
+                buckets[priority].append(prop)
             
-            logger.info(f"🔄 Property reordering: {len(budget_properties)} budget, {len(location_properties)} location, {len(property_type_properties)} type, {len(other_properties)} other")
+            logger.info("🔄 Property reordering: %s budget, %s location, %s type, %s other", *map(len, buckets))
             
-            return ordered_properties
+            # Combine in priority order
+            return buckets[0] + buckets[1] + buckets[2] + buckets[3]
             
         except Exception as e:
             logger.error(f"❌ Error reordering properties: {e}")
             return properties  # Return original order on error
     
-    def _get_property_price(self, prop):
-        """Extract property price from property object"""
-        try:
-            if isinstance(prop, dict):
-                return prop.get('sale_price_aed') or prop.get('rent_price_aed')
-            else:
-                return getattr(prop, 'sale_price_aed', None) or getattr(prop, 'rent_price_aed', None)
-        except:
-            return None
+    def _extract_prop_fields(self, prop) -> Tuple[Any, str, str]:
+        """Extract (price, location, property_type) from a property dict or object in one pass"""
+        if isinstance(prop, dict):
+            price = prop.get('sale_price_aed') or prop.get('rent_price_aed')
+            prop_type = prop.get('property_type', '')
+        else:
+            price = getattr(prop, 'sale_price_aed', None) or getattr(prop, 'rent_price_aed', None)
+            prop_type = getattr(prop, 'property_type', '')
+        return price, self._get_property_location(prop), prop_type
     
     def _get_property_location(self, prop):
         """Extract property location from property object"""
-        try:
-            if isinstance(prop, dict):
-                address = prop.get('address', {})
-                if isinstance(address, str):
-                    import json
-                    try:
-                        address = json.loads(address)
-                    except:
-                        return address
-                return address.get('locality', '') if isinstance(address, dict) else ''
-            else:
-                address = getattr(prop, 'address', {})
-                if isinstance(address, str):
-                    import json
-                    try:
-                        address = json.loads(address)
-                    except:
-                        return address
-                return address.get('locality', '') if isinstance(address, dict) else ''
-        except:
-            return ''
-    
-    def _get_property_type(self, prop):
-        """Extract property type from property object"""
-        try:
-            if isinstance(prop, dict):
-                return prop.get('property_type', '')
-            else:
-                return getattr(prop, 'property_type', '')
-        except:
-            return ''
+        # _parse_address only catches the JSON decode error, so nothing here can raise
+        address = _parse_address(prop)
+        if isinstance(address, str):
+            # Plain-text address that isn't JSON - use it as the location
+            return address
+        return address.get('locality', '') if isinstance(address, dict) else ''
     
     async def _handle_pagination_request(self, message: str, session: ConversationSession, requirements: UserRequirements) -> ConversationResponse:
         """
@@ -1487,7 +1919,7 @@ What would you like to try?"""
         properties_shown = session.context.get('properties_shown', 0)
         properties_per_batch = session.context.get('properties_per_batch', 10)
         
-        logger.info(f"📄 PAGINATION_DEBUG: all_properties count = {len(all_properties)}, properties_shown = {properties_shown}")
+        logger.info("📄 PAGINATION_DEBUG: all_properties count = %s, properties_shown = %s", len(all_properties), properties_shown)
         
         if not all_properties:
             logger.warning("⚠️ No all_available_properties found in session context")
@@ -1514,26 +1946,15 @@ What would you like to try?"""
         end_index = start_index + next_batch_size
         next_batch = all_properties[start_index:end_index]
         
-        logger.info(f"📄 Sending next batch: properties {start_index+1}-{end_index} of {total_properties}")
+        logger.info("📄 Sending next batch: properties %s-%s of %s", start_index + 1, end_index, total_properties)
         
-        # Extract property IDs for carousel
-        property_ids = []
-        for i, prop in enumerate(next_batch):
-            prop_id = None
-            
-            if isinstance(prop, dict):
-                if prop.get('original_property_id'):
-                    prop_id = str(prop['original_property_id'])
-                elif prop.get('id'):
-                    prop_id = str(prop['id'])
-            elif hasattr(prop, 'original_property_id') and prop.original_property_id:
-                prop_id = str(prop.original_property_id)
-            elif hasattr(prop, 'id') and prop.id:
-                prop_id = str(prop.id)
-            
-            if prop_id:
-                property_ids.append(prop_id)
-                logger.info(f"🆔 Batch {start_index//properties_per_batch + 2} Property {i+1}: ID = {prop_id}")
+        # Property IDs for carousel - extracted once when the results were stored, so this is a slice
+        all_property_ids = session.context.get('all_available_property_ids')
+        if all_property_ids is None or len(all_property_ids) != total_properties:
+            all_property_ids = [self.get_property_id(prop) for prop in all_properties]
+            session.context['all_available_property_ids'] = all_property_ids
+        property_ids = [prop_id for prop_id in all_property_ids[start_index:end_index] if prop_id]
+        logger.info("🆔 Batch %s property IDs: %s", start_index // properties_per_batch + 2, property_ids)
         
         if len(property_ids) >= 1:  # Send carousel for 1+ properties
             # Store pagination info for carousel sending (will be handled by agent system)
@@ -1556,7 +1977,12 @@ What would you like to try?"""
             )
         else:
             # Not enough properties for carousel, format as text
-            properties_text = self._format_properties_text(next_batch, start_index + 1)
+            # Format every stored property once; later "show more" batches are a slice of the cached lines
+            property_lines = session.context.get('formatted_property_lines')
+            if property_lines is None or len(property_lines) != total_properties:
+                property_lines = [self._format_property_line(prop, number) for number, prop in enumerate(all_properties, 1)]
+                session.context['formatted_property_lines'] = property_lines
+            properties_text = self._format_properties_text(next_batch, start_index + 1, property_lines[start_index:end_index])
             
             # Update session
             session.context['properties_shown'] = end_index
@@ -1571,75 +1997,81 @@ What would you like to try?"""
                 requirements=requirements
             )
     
-    def _format_properties_text(self, properties: List[Dict[str, Any]], start_number: int = 1) -> str:
+    @staticmethod
+    def get_property_id(prop) -> Optional[str]:
+        """
+        Carousel ID for a property dict or object, preferring original_property_id over id
+        """
+        if isinstance(prop, dict):
+            prop_id = prop.get('original_property_id') or prop.get('id')
+        else:
+            prop_id = getattr(prop, 'original_property_id', None) or getattr(prop, 'id', None)
+        return str(prop_id) if prop_id else None
+    
+    def _format_properties_text(self, properties: List[Dict[str, Any]], start_number: int = 1,
+                                property_lines: Optional[List[str]] = None) -> str:
         """
         Format properties as WhatsApp text message
+        property_lines can carry lines already built by _format_property_line for these properties
         """
         if not properties:
             return "No properties to display."
         
-        response_parts = [f"🏠 **Properties {start_number}-{start_number + len(properties) - 1}:**\n"]
+        if property_lines is None:
+            property_lines = [self._format_property_line(prop, start_number + i) for i, prop in enumerate(properties)]
         
-        for i, prop in enumerate(properties):
-            try:
-                # Extract basic info
-                property_type = prop.get('property_type', 'Property')
-                bedrooms = prop.get('bedrooms', 0)
-                bathrooms = prop.get('bathrooms', 0)
-                
-                # Format price
-                price = "Price on request"
-                if prop.get('sale_price_aed'):
-                    price = f"AED {prop['sale_price_aed']:,}"
-                elif prop.get('rent_price_aed'):
-                    price = f"AED {prop['rent_price_aed']:,}/year"
-                
-                # Extract location
-                address = prop.get('address', {})
-                if isinstance(address, str):
-                    try:
-                        address = json.loads(address)
-                    except:
-                        address = {}
-                
-                location = "Dubai"
-                if address and address.get('locality'):
-                    location = address['locality']
-                
-                building_name = prop.get('building_name', '')
-                if building_name:
-                    location = f"{building_name}, {location}"
-                
-                # Format size and features
-                features = []
-                if prop.get('bua_sqft'):
-                    features.append(f"{prop['bua_sqft']:,} sqft")
-                if bathrooms:
-                    features.append(f"{bathrooms} bath")
-                if prop.get('study'):
-                    features.append('study')
-                if prop.get('maid_room'):
-                    features.append('maid room')
-                if prop.get('landscaped_garden'):
-                    features.append('garden')
-                if prop.get('covered_parking_spaces'):
-                    features.append(f"{prop['covered_parking_spaces']} parking")
-                
-                features_text = " • ".join(features) if features else ""
-                
-                property_line = f"{start_number + i}. 🏠 *{bedrooms}BR {property_type}*\n"
-                property_line += f"💰 {price}\n"
-                property_line += f"📍 {location}\n"
-                if features_text:
-                    property_line += f"✨ {features_text}\n"
-                
-                response_parts.append(property_line)
-                
-            except Exception as e:
-                logger.error(f"❌ Error formatting property {i+1}: {e}")
-                response_parts.append(f"{start_number + i}. Property details available - ask for more info!\n")
-        
-        return "\n".join(response_parts)
+        return "\n".join([f"🏠 **Properties {start_number}-{start_number + len(properties) - 1}:**\n", *property_lines])
+    
+    def _format_property_line(self, prop: Dict[str, Any], number: int) -> str:
+        """
+        Format one numbered property entry for the WhatsApp text list
+        """
+        try:
+            # Extract basic info
+            property_type = prop.get('property_type', 'Property')
+            bedrooms = prop.get('bedrooms', 0)
+            bathrooms = prop.get('bathrooms', 0)
+            
+            # Format price
+            price = "Price on request"
+            if prop.get('sale_price_aed'):
+                price = _format_aed(prop['sale_price_aed'])
+            elif prop.get('rent_price_aed'):
+                price = _format_aed(prop['rent_price_aed'], per_year=True)
+            
+            # Extract location
+            address = _parse_address(prop)
+            
+            location = "Dubai"
+            if isinstance(address, dict) and address.get('locality'):
+                location = address['locality']
+            
+            building_name = prop.get('building_name', '')
+            if building_name:
+                location = f"{building_name}, {location}"
+            
+            # Format size and features
+            features = []
+            if prop.get('bua_sqft'):
+                features.append(f"{prop['bua_sqft']:,} sqft")
+            if bathrooms:
+                features.append(f"{bathrooms} bath")
+            features.extend(label for key, label in _FLAG_FEATURES if prop.get(key))
+            if prop.get('covered_parking_spaces'):
+                features.append(f"{prop['covered_parking_spaces']} parking")
+            
+            return _PROPERTY_LINE_TEMPLATE.format_map({
+                'number': number,
+                'bedrooms': bedrooms,
+                'property_type': property_type,
+                'price': price,
+                'location': location,
+                'features_line': f"✨ {' • '.join(features)}\n" if features else '',
+            })
+            
+        except Exception as e:
+            logger.error(f"❌ Error formatting property {number}: {e}")
+            return f"{number}. Property details available - ask for more info!\n"
 
 
 # Global instance
@@ -0,0 +1,34 @@
+"""
+Fast JSON helpers for hot paths
+Uses orjson when installed and falls back to the stdlib json module
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can catch this either way
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: Any) -> Any:
+    """
+    Parse JSON from str or bytes
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, sort_keys: bool = False) -> str:
+    """
+    Serialize to a compact JSON string (sort_keys gives stable cache keys)
+    """
+    if orjson is not None:
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False)
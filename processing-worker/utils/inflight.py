@@ -0,0 +1,24 @@
+"""
+Sharing of in-flight asyncio tasks between concurrent callers
+One task runs per key; callers arriving while it is pending await the same result
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def shared_task(
+    requests: Dict[Hashable, asyncio.Task],
+    key: Hashable,
+    start: Callable[[], Awaitable[Any]]
+) -> Awaitable[Any]:
+    """
+    Await the task pending under key, or start one with start(); it leaves requests once done.
+    The task is shielded, so one caller's cancellation doesn't cancel it for the others
+    """
+    request = requests.get(key)
+    if request is None:
+        request = asyncio.create_task(start())
+        requests[key] = request
+        request.add_done_callback(lambda _: requests.pop(key, None))
+    return asyncio.shield(request)
@@ -7,6 +7,18 @@ import structlog
 import os
 from typing import Any, Dict
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+def _orjson_serializer(obj: Any, **kwargs: Any) -> str:
+    """
+    JSONRenderer serializer backed by orjson (non-str keys allowed, e.g. bedroom-count dicts)
+    """
+    return orjson.dumps(obj, default=kwargs.get("default"), option=orjson.OPT_NON_STR_KEYS).decode()
+
 
 def setup_logger(name: str) -> structlog.stdlib.BoundLogger:
     """
@@ -24,10 +36,12 @@ def setup_logger(name: str) -> structlog.stdlib.BoundLogger:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
+            structlog.processors.JSONRenderer(serializer=_orjson_serializer) if orjson is not None
+            else structlog.processors.JSONRenderer()
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
     
@@ -55,7 +69,10 @@ def log_agent_interaction(
 ) -> None:
     """
     Log agent interactions with structured metadata
+    Skipped entirely (no event dict, no processor chain) when INFO is filtered out
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
     logger.info(
         "Agent interaction completed",
         user_id=user_id,
@@ -3,21 +3,48 @@ Professional Response Cache System
 Eliminates redundant OpenAI calls and provides instant responses for common queries
 """
 
+import re
 import time
-import json
-import hashlib
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Set, Tuple
+from utils import fast_json
 from utils.logger import setup_logger
+from utils.text_processor import keyword_re
 
 logger = setup_logger(__name__)
 
+
+# Queries mentioning any of these go through the full search pipeline, never a template
+_PROPERTY_SEARCH_RE = keyword_re([
+    'properties', 'property', 'show me', 'find me', 'tell me', 'search',
+    'cheapest', 'top', 'best', 'all properties', 'available properties',
+    'what properties', 'other properties', 'more properties', 'apartments',
+    'villas', 'townhouses', 'penthouses', 'plots', 'br', 'bedroom',
+    'marina', 'downtown', 'jbr', 'dubai', 'rent', 'sale', 'buy'
+])
+_BOOKING_RE = keyword_re(['book', 'schedule', 'visit', 'viewing', 'appointment'])
+_LOCATION_RE = keyword_re(['where', 'location', 'address', 'area'])
+
+# Query normalization for cache keys: punctuation that never changes meaning is dropped, and a '.' only
+# when it isn't a decimal point ("1.5M" must not become "15M"); whitespace runs collapse to one space
+_QUERY_PUNCT_TABLE = str.maketrans('', '', '?!,;:"\'()')
+_QUERY_NON_DECIMAL_DOT_RE = re.compile(r"(?<!\d)\.|\.(?!\d)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# (normalized query, user_id, relevant context JSON) - used directly as the in-process dict key
+CacheKey = Tuple[str, Optional[str], str]
+
+
 class ResponseCache:
     """
     Professional-grade response cache with intelligent invalidation
     """
     
     def __init__(self, ttl_seconds: int = 300):  # 5 minutes default TTL
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        # Kept in write order, so the oldest entry is always at the front
+        self.cache: "OrderedDict[CacheKey, Dict[str, Any]]" = OrderedDict()
+        # user_id -> that user's cache keys, so invalidation doesn't scan the whole cache
+        self._user_keys: Dict[str, Set[CacheKey]] = {}
         self.ttl_seconds = ttl_seconds
         self.hit_count = 0
         self.miss_count = 0
@@ -29,24 +56,27 @@ class ResponseCache:
             'location_info': self._get_location_info_template()
         }
     
-    def _generate_cache_key(self, query: str, user_context: Dict = None) -> str:
+    def _generate_cache_key(self, query: str, user_context: Dict = None) -> CacheKey:
         """Generate deterministic cache key"""
         # Normalize query
-        normalized = query.lower().strip()
+        normalized = query.lower().translate(_QUERY_PUNCT_TABLE)
+        normalized = _WHITESPACE_RE.sub(' ', _QUERY_NON_DECIMAL_DOT_RE.sub('', normalized)).strip()
         
         # Add context if relevant
+        user_id = None
         context_str = ""
         if user_context:
             # Only include relevant context for caching
             relevant_keys = ['user_id', 'active_properties_count', 'last_search_type']
             context_data = {k: v for k, v in user_context.items() if k in relevant_keys}
-            context_str = json.dumps(context_data, sort_keys=True)
+            context_str = fast_json.dumps(context_data, sort_keys=True)
+            user_id = context_data.get('user_id')
         
-        # Create hash
-        cache_input = f"{normalized}:{context_str}"
-        return hashlib.md5(cache_input.encode()).hexdigest()
+        # The cache is in-process, so the tuple itself is the key - no digest needed,
+        # and user_id stays readable for invalidate_user_cache
+        return (normalized, user_id, context_str)
     
-    def get(self, cache_key: str) -> Optional[Dict[str, Any]]:
+    def get(self, cache_key: CacheKey) -> Optional[Dict[str, Any]]:
         """Get cached response if valid"""
         if cache_key not in self.cache:
             self.miss_count += 1
@@ -56,25 +86,39 @@ class ResponseCache:
         
         # Check if expired
         if time.time() - cached_item['timestamp'] > self.ttl_seconds:
-            del self.cache[cache_key]
+            self._remove(cache_key)
             self.miss_count += 1
             return None
         
         self.hit_count += 1
-        logger.info(f"🎯 CACHE HIT: {cache_key[:8]}... (hit rate: {self.get_hit_rate():.1%})")
+        logger.info(f"🎯 CACHE HIT: {cache_key[0][:40]!r} (hit rate: {self.get_hit_rate():.1%})")
         return cached_item['data']
     
-    def set(self, cache_key: str, data: Dict[str, Any]) -> None:
+    def set(self, cache_key: CacheKey, data: Dict[str, Any]) -> None:
         """Cache response data"""
         self.cache[cache_key] = {
             'data': data,
             'timestamp': time.time()
         }
+        self.cache.move_to_end(cache_key)
+        user_id = cache_key[1]
+        if user_id is not None:
+            self._user_keys.setdefault(user_id, set()).add(cache_key)
         
         # Simple cleanup: remove oldest if cache gets too large
         if len(self.cache) > 1000:
-            oldest_key = min(self.cache.keys(), key=lambda k: self.cache[k]['timestamp'])
-            del self.cache[oldest_key]
+            self._remove(next(iter(self.cache)))
+    
+    def _remove(self, cache_key: CacheKey) -> None:
+        """Drop an entry and its per-user index slot"""
+        del self.cache[cache_key]
+        user_id = cache_key[1]
+        if user_id is not None:
+            user_keys = self._user_keys.get(user_id)
+            if user_keys is not None:
+                user_keys.discard(cache_key)
+                if not user_keys:
+                    del self._user_keys[user_id]
     
     def get_hit_rate(self) -> float:
         """Calculate cache hit rate"""
@@ -86,27 +130,16 @@ class ResponseCache:
         query_lower = query.lower().strip()
         
         # DISABLE templates for ALL property search queries to ensure full pipeline
-        property_search_keywords = [
-            'properties', 'property', 'show me', 'find me', 'tell me', 'search',
-            'cheapest', 'top', 'best', 'all properties', 'available properties',
-            'what properties', 'other properties', 'more properties', 'apartments',
-            'villas', 'townhouses', 'penthouses', 'plots', 'br', 'bedroom',
-            'marina', 'downtown', 'jbr', 'dubai', 'rent', 'sale', 'buy'
-        ]
-        
-        # If query contains property search keywords, don't use template - go through full pipeline
-        if any(keyword in query_lower for keyword in property_search_keywords):
+        if _PROPERTY_SEARCH_RE.search(query_lower):
             logger.info(f"🎠 TEMPLATE_DISABLED: Property search query detected, using full pipeline")
             return None
         
         # Booking confirmations
-        booking_patterns = ['book', 'schedule', 'visit', 'viewing', 'appointment']
-        if any(pattern in query_lower for pattern in booking_patterns):
+        if _BOOKING_RE.search(query_lower):
             return 'booking_confirmation'
         
         # Location queries  
-        location_patterns = ['where', 'location', 'address', 'area']
-        if any(pattern in query_lower for pattern in location_patterns):
+        if _LOCATION_RE.search(query_lower):
             return 'location_info'
         
         return None
@@ -201,17 +234,10 @@ Would you like to schedule a visit to see this location? 🏠"""
     
     def invalidate_user_cache(self, user_id: str) -> int:
         """Invalidate all cache entries for a specific user"""
-        invalidated = 0
-        keys_to_remove = []
-        
-        for key, value in self.cache.items():
-            # Check if this cache entry is for the specific user
-            if f'"user_id": "{user_id}"' in key:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.cache[key]
-            invalidated += 1
+        user_keys = self._user_keys.pop(user_id, ())
+        for key in user_keys:
+            self.cache.pop(key, None)
+        invalidated = len(user_keys)
         
         if invalidated > 0:
             logger.info(f"🧹 Invalidated {invalidated} cache entries for user {user_id}")
@@ -221,19 +247,20 @@ Would you like to schedule a visit to see this location? 🏠"""
     def clear_expired(self) -> int:
         """Clear all expired cache entries"""
         current_time = time.time()
-        expired_keys = []
-        
-        for key, value in self.cache.items():
-            if current_time - value['timestamp'] > self.ttl_seconds:
-                expired_keys.append(key)
+        cleared = 0
         
-        for key in expired_keys:
-            del self.cache[key]
+        # Entries are in write order, so stop at the first one that is still fresh
+        while self.cache:
+            oldest_key = next(iter(self.cache))
+            if current_time - self.cache[oldest_key]['timestamp'] <= self.ttl_seconds:
+                break
+            self._remove(oldest_key)
+            cleared += 1
         
-        if expired_keys:
-            logger.info(f"🧹 Cleared {len(expired_keys)} expired cache entries")
+        if cleared:
+            logger.info(f"🧹 Cleared {cleared} expired cache entries")
         
-        return len(expired_keys)
+        return cleared
 
 # Global cache instance
 response_cache = ResponseCache()
\ No newline at end of file
@@ -2,18 +2,74 @@
 Session management for WhatsApp conversations
 """
 
-import json
+import asyncio
+import heapq
+import itertools
+import logging
 import time
-from typing import Dict, Any, Optional
-from dataclasses import dataclass, asdict
+import types
+from collections import deque
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
+from dataclasses import dataclass
 import os
 
+from cachetools import TTLCache
+
+from .inflight import shared_task
 from .logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Messages kept per session; older ones fall off the front of the history deque
+_MAX_HISTORY_MESSAGES = 50
+
+# Ordinal and numeric ("1".."50") property references -> 0-based index into the active properties (read-only)
+_REFERENCE_INDEX: Mapping[str, int] = types.MappingProxyType({
+    'first': 0, '1st': 0, 'one': 0,
+    'second': 1, '2nd': 1, 'two': 1,
+    'third': 2, '3rd': 2, 'three': 2,
+    'fourth': 3, '4th': 3, 'four': 3,
+    'fifth': 4, '5th': 4, 'five': 4,
+    **{str(number): number - 1 for number in range(1, 51)}
+})
+
+# Shared metadata for the common case of a message without any (read-only, so it can't leak between messages)
+_EMPTY_METADATA: Mapping[str, Any] = types.MappingProxyType({})
+
 
-@dataclass
+class Message:
+    """
+    One conversation history entry
+    Slotted instead of a per-message dict; readers can still use msg['role'] / msg.get('role')
+    """
+    __slots__ = ('timestamp', 'role', 'content', 'agent_name', 'type', 'metadata')
+    
+    def __init__(
+        self,
+        timestamp: float,
+        role: str,
+        content: str,
+        agent_name: Optional[str],
+        message_type: str = "text",
+        metadata: Optional[Mapping[str, Any]] = None
+    ):
+        self.timestamp = timestamp
+        self.role = role
+        self.content = content
+        self.agent_name = agent_name
+        self.type = message_type
+        self.metadata = metadata or _EMPTY_METADATA
+    
+    def __getitem__(self, key: str) -> Any:
+        if key not in Message.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in Message.__slots__ else default
+
+
+@dataclass(slots=True)
 class ConversationSession:
     """
     Represents a conversation session for a WhatsApp user
@@ -22,7 +78,7 @@ class ConversationSession:
     created_at: float
     last_updated: float
     current_agent: Optional[str] = None
-    conversation_history: list = None
+    conversation_history: deque = None
     context: Dict[str, Any] = None
     metadata: Dict[str, Any] = None
     # Name collection tracking
@@ -36,8 +92,8 @@ class ConversationSession:
     org_name: str = ""
     
     def __post_init__(self):
-        if self.conversation_history is None:
-            self.conversation_history = []
+        if not isinstance(self.conversation_history, deque):
+            self.conversation_history = deque(self.conversation_history or (), maxlen=_MAX_HISTORY_MESSAGES)
         if self.context is None:
             self.context = {}
         if self.metadata is None:
@@ -45,65 +101,65 @@ class ConversationSession:
     
     def add_message(self, role: str, content: str, agent_name: str, metadata: Dict[str, Any] = None, message_type: str = "text"):
         """Add a message to the conversation history"""
-        import time
-        
-        message = {
-            "timestamp": time.time(),
-            "role": role,
-            "content": content,
-            "agent_name": agent_name,
-            "type": message_type,  # Adding type field as requested
-            "metadata": metadata or {}
-        }
-        
-        self.conversation_history.append(message)
-        self.last_updated = time.time()
+        now = time.time()
+        self.conversation_history.append(Message(now, role, content, agent_name, message_type, metadata))
+        self.last_updated = now
+    
+    def recent_messages(self, limit: int) -> list:
+        """Last `limit` messages, oldest first (deques can't be sliced)"""
+        if limit <= 0:
+            return []
+        return list(itertools.islice(reversed(self.conversation_history), limit))[::-1]
 
 
 class SessionManager:
     """
     Manages conversation sessions with in-memory storage
     """
-    _instance = None
-    _sessions = {}
-    
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(SessionManager, cls).__new__(cls)
-        return cls._instance
     
     def __init__(self):
-        if not hasattr(self, 'initialized'):
-            self.sessions: Dict[str, ConversationSession] = SessionManager._sessions
-            self.session_timeout = int(os.getenv("SESSION_TIMEOUT_HOURS", "24")) * 3600  # 24 hours default
-            self.initialized = True
-            logger.info("Session manager initialized with in-memory storage")
+        self.sessions: Dict[str, ConversationSession] = {}
+        self.session_timeout = int(os.getenv("SESSION_TIMEOUT_HOURS", "24")) * 3600  # 24 hours default
+        # (earliest possible expiry, user_id) - at most one entry per user, re-checked when it comes due
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._expiry_scheduled: Set[str] = set()
+        # Successful org metadata lookups keyed by (user_id, WhatsApp business account); new sessions for
+        # a user seen in the last few minutes (timeouts, clears) skip the edge function call
+        self._org_metadata_cache = TTLCache(maxsize=2048, ttl=300)
+        # Session initialisations still in flight, by (user_id, WhatsApp business account)
+        self._init_requests: Dict[Tuple[str, str], asyncio.Task] = {}
+        logger.info("Session manager initialized with in-memory storage")
     
     def get_session(self, user_id: str) -> ConversationSession:
         """
         Get or create a session for a user
         """
+        now = time.time()
+        
         # Check if session exists in memory
-        if user_id in self.sessions:
-            session = self.sessions[user_id]
+        session = self.sessions.get(user_id)
+        if session is not None:
             # Check if session is still valid
-            if time.time() - session.last_updated < self.session_timeout:
+            if now - session.last_updated < self.session_timeout:
                 return session
             else:
                 # Session expired, remove it
                 del self.sessions[user_id]
         
         # No persistent storage, so continue with new session creation
+        # Nothing else runs the expiry sweep; with the expiry heap it only touches sessions that are due
+        self.cleanup_expired_sessions()
         
         # Create new session
         session = ConversationSession(
             user_id=user_id,
-            created_at=time.time(),
-            last_updated=time.time()
+            created_at=now,
+            last_updated=now
         )
         
         self.sessions[user_id] = session
-        logger.info(f"Created new session for user: {user_id}")
+        self._schedule_expiry(user_id, session)
+        logger.info("Created new session for user: %s", user_id)
         
         return session
     
@@ -122,31 +178,55 @@ class SessionManager:
         if session.customer_name:
             return session
         
+        # A burst of messages from a new user would otherwise fetch the org metadata once per message;
+        # the later ones wait for the first fetch and get the same initialised session
+        key = (user_id, whatsapp_business_account)
+        if key in self._init_requests:
+            logger.info("🔗 [SESSION_INIT] joining pending initialisation for %s", user_id)
+        return await shared_task(
+            self._init_requests, key, lambda: self._load_user_data(user_id, whatsapp_business_account, session)
+        )
+    
+    async def _load_user_data(
+        self,
+        user_id: str,
+        whatsapp_business_account: str,
+        session: ConversationSession
+    ) -> ConversationSession:
+        """
+        Load the user's org metadata into the session
+        """
         # Fetch organization metadata (primary source for user data)
         try:
             from src.services.messaging import fetch_org_metadata_internal
             
             # Fetch organization metadata - now includes customer_name, properties, etc.
-            org_metadata = await fetch_org_metadata_internal(user_id, whatsapp_business_account)
+            cache_key = (user_id, whatsapp_business_account)
+            org_metadata = self._org_metadata_cache.get(cache_key)
+            if org_metadata is None:
+                org_metadata = await fetch_org_metadata_internal(user_id, whatsapp_business_account)
+                # Errors are not cached so the next message retries
+                if org_metadata and not org_metadata.get("error"):
+                    self._org_metadata_cache[cache_key] = org_metadata
             
             if org_metadata and not org_metadata.get("error"):
                 # Set organization info
                 session.org_id = org_metadata.get("org_id", "")
                 session.org_name = org_metadata.get("org_name", "")
-                logger.info(f"🏢 [SESSION_INIT] Loaded org metadata for {user_id}: {session.org_name} (ID: {session.org_id})")
+                logger.info("🏢 [SESSION_INIT] Loaded org metadata for %s: %s (ID: %s)", user_id, session.org_name, session.org_id)
                 
                 # Set customer name from org metadata
                 org_customer_name = org_metadata.get("customer_name")
                 if org_customer_name:
                     session.customer_name = org_customer_name
                     session.name_collection_asked = True  # Don't ask again if we have it
-                    logger.info(f"✅ [SESSION_INIT] Loaded customer name from org metadata: {org_customer_name}")
+                    logger.info("✅ [SESSION_INIT] Loaded customer name from org metadata: %s", org_customer_name)
                 
                 # Set user properties if available
                 user_properties = org_metadata.get("properties")
                 if user_properties:
                     session.context['user_properties'] = user_properties
-                    logger.info(f"🏠 [SESSION_INIT] Loaded user properties: {len(user_properties) if isinstance(user_properties, list) else 'N/A'}")
+                    logger.info("🏠 [SESSION_INIT] Loaded user properties: %s", len(user_properties) if isinstance(user_properties, list) else 'N/A')
                 
             else:
                 logger.warning(f"⚠️ [SESSION_INIT] Failed to fetch org metadata for {user_id}: {org_metadata.get('error', 'Unknown error')}")
@@ -159,12 +239,31 @@ class SessionManager:
         
         return session
     
-    def update_session(self, user_id: str, session: ConversationSession) -> None:
+    def update_session(self, user_id: str, session: ConversationSession, now: Optional[float] = None) -> None:
         """
         Update session data in memory
+        now lets a caller that already read the clock stamp the session with the same time
         """
-        session.last_updated = time.time()
+        session.last_updated = time.time() if now is None else now
         self.sessions[user_id] = session
+        self._schedule_expiry(user_id, session)
+    
+    @staticmethod
+    def _touch(session: ConversationSession, now: Optional[float] = None) -> None:
+        """
+        Stamp a session fetched with get_session in the same synchronous call
+        It is already stored and scheduled for expiry, so only last_updated changes
+        """
+        session.last_updated = time.time() if now is None else now
+    
+    def _schedule_expiry(self, user_id: str, session: ConversationSession) -> None:
+        """
+        Make sure the user has an expiry-heap entry; activity after that only moves the real deadline later,
+        which cleanup re-checks, so no entry is pushed per update
+        """
+        if user_id not in self._expiry_scheduled:
+            self._expiry_scheduled.add(user_id)
+            heapq.heappush(self._expiry_heap, (session.last_updated + self.session_timeout, user_id))
         
     def add_message_to_history(
         self, 
@@ -179,23 +278,12 @@ class SessionManager:
         Add a message to the conversation history
         """
         session = self.get_session(user_id)
+        now = time.time()
         
-        message = {
-            "timestamp": time.time(),
-            "role": role,  # "user" or "assistant"
-            "content": content,
-            "agent_name": agent_name,
-            "type": message_type,  # Adding type field as requested
-            "metadata": metadata or {}
-        }
-        
-        session.conversation_history.append(message)
-        
-        # Keep only last 50 messages to prevent memory issues
-        if len(session.conversation_history) > 50:
-            session.conversation_history = session.conversation_history[-50:]
+        # The history deque drops the oldest message once it holds the last 50
+        session.conversation_history.append(Message(now, role, content, agent_name, message_type, metadata))
         
-        self.update_session(user_id, session)
+        self._touch(session, now)
     
     def set_current_agent(self, user_id: str, agent_name: str) -> None:
         """
@@ -203,14 +291,14 @@ class SessionManager:
         """
         session = self.get_session(user_id)
         session.current_agent = agent_name
-        self.update_session(user_id, session)
+        self._touch(session)
     
     def get_conversation_history(self, user_id: str, limit: int = 10) -> list:
         """
         Get recent conversation history
         """
         session = self.get_session(user_id)
-        return session.conversation_history[-limit:] if session.conversation_history else []
+        return session.recent_messages(limit)
     
     def update_context(self, user_id: str, context_update: Dict[str, Any]) -> None:
         """
@@ -218,17 +306,18 @@ class SessionManager:
         """
         session = self.get_session(user_id)
         session.context.update(context_update)
-        self.update_session(user_id, session)
+        self._touch(session)
     
     def set_active_properties(self, user_id: str, properties: list) -> None:
         """
         Set the active properties from a search result
         """
         session = self.get_session(user_id)
+        now = time.time()
         session.context['active_properties'] = properties
-        session.context['active_properties_updated'] = time.time()
-        self.update_session(user_id, session)
-        logger.info(f"Set {len(properties)} active properties for user {user_id}")
+        session.context['active_properties_updated'] = now
+        self._touch(session, now)
+        logger.info("Set %d active properties for user %s", len(properties), user_id)
     
     def get_active_properties(self, user_id: str) -> list:
         """
@@ -237,47 +326,49 @@ class SessionManager:
         session = self.get_session(user_id)
         return session.context.get('active_properties', [])
     
+    @staticmethod
+    def _property_search_texts(session: ConversationSession, properties: list) -> list:
+        """
+        Case-folded "building|type|locality" text per active property, built once per properties list
+        The separator can't occur in a reference word, so one substring test matches any of the three fields
+        """
+        # Reuse while the stored list is the one the texts were built from (it is also replaced directly in context)
+        cached = session.context.get('_active_properties_search_texts')
+        if cached is not None and cached[0] is properties:
+            return cached[1]
+        
+        search_texts = []
+        for prop in properties:
+            address = prop.get('address')
+            locality = address.get('locality') if isinstance(address, dict) else None
+            search_texts.append("\x00".join(
+                (field or '').casefold() for field in (prop.get('building_name'), prop.get('property_type'), locality)
+            ))
+        session.context['_active_properties_search_texts'] = (properties, search_texts)
+        return search_texts
+    
     def get_property_by_reference(self, user_id: str, reference: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific property by reference (name, first, second, etc.)
         """
-        properties = self.get_active_properties(user_id)
+        session = self.get_session(user_id)
+        properties = session.context.get('active_properties', [])
         if not properties:
             return None
         
-        reference = reference.lower().strip()
-        
-        # Handle ordinal references
-        ordinal_map = {
-            'first': 0, '1st': 0, 'one': 0,
-            'second': 1, '2nd': 1, 'two': 1, 
-            'third': 2, '3rd': 2, 'three': 2,
-            'fourth': 3, '4th': 3, 'four': 3,
-            'fifth': 4, '5th': 4, 'five': 4
-        }
-        
-        if reference in ordinal_map:
-            index = ordinal_map[reference]
-            if index < len(properties):
-                return properties[index]
+        reference = reference.casefold().strip()
         
-        # Handle numeric references
-        try:
+        # Handle ordinal and numeric references in one probe; larger numbers are parsed
+        # (isdecimal guards int(), so no exception path)
+        index = _REFERENCE_INDEX.get(reference)
+        if index is None and reference.isdecimal():
             index = int(reference) - 1  # Convert to 0-based index
-            if 0 <= index < len(properties):
-                return properties[index]
-        except ValueError:
-            pass
+        if index is not None and 0 <= index < len(properties):
+            return properties[index]
         
         # Handle property name matching
-        for prop in properties:
-            building_name = prop.get('building_name', '').lower()
-            property_type = prop.get('property_type', '').lower()
-            locality = prop.get('address', {}).get('locality', '').lower()
-            
-            if (reference in building_name or 
-                reference in property_type or 
-                reference in locality):
+        for prop, search_text in zip(properties, self._property_search_texts(session, properties)):
+            if reference in search_text:
                 return prop
         
         # Default to first property if no specific match
@@ -287,9 +378,8 @@ class SessionManager:
         """
         Clear a user's session from memory
         """
-        if user_id in self.sessions:
-            del self.sessions[user_id]
-            logger.info(f"Cleared session for user: {user_id}")
+        if self.sessions.pop(user_id, None) is not None:
+            logger.info("Cleared session for user: %s", user_id)
     
     def cleanup_expired_sessions(self) -> None:
         """
@@ -297,16 +387,25 @@ class SessionManager:
         """
         current_time = time.time()
         expired_users = []
+        heap = self._expiry_heap
         
-        for user_id, session in self.sessions.items():
+        # Only entries that have come due are looked at; sessions touched since are rescheduled
+        while heap and heap[0][0] < current_time:
+            _, user_id = heapq.heappop(heap)
+            self._expiry_scheduled.discard(user_id)
+            session = self.sessions.get(user_id)
+            if session is None:
+                continue
             if current_time - session.last_updated > self.session_timeout:
                 expired_users.append(user_id)
+            else:
+                self._schedule_expiry(user_id, session)
         
         for user_id in expired_users:
             self.clear_session(user_id)
         
         if expired_users:
-            logger.info(f"Cleaned up {len(expired_users)} expired sessions")
+            logger.info("Cleaned up %d expired sessions", len(expired_users))
     
     def increment_question_count(self, user_id: str) -> None:
         """
@@ -314,8 +413,8 @@ class SessionManager:
         """
         session = self.get_session(user_id)
         session.user_question_count += 1
-        self.update_session(user_id, session)
-        logger.info(f"User {user_id} question count: {session.user_question_count}")
+        self._touch(session)
+        logger.info("User %s question count: %d", user_id, session.user_question_count)
     
     def should_ask_for_name(self, user_id: str, threshold: int = 2) -> bool:
         """
@@ -327,7 +426,12 @@ class SessionManager:
             not session.customer_name and
             not session.name_collection_asked
         )
-        logger.info(f"🤔 [NAME_CHECK] User {user_id}: count={session.user_question_count}, threshold={threshold}, has_name={bool(session.customer_name)}, already_asked={session.name_collection_asked}, should_ask={should_ask}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "🤔 [NAME_CHECK] User %s: count=%d, threshold=%d, has_name=%s, already_asked=%s, should_ask=%s",
+                user_id, session.user_question_count, threshold, bool(session.customer_name),
+                session.name_collection_asked, should_ask,
+            )
         return should_ask
     
     def mark_name_collection_asked(self, user_id: str, pending_question: str = "") -> None:
@@ -338,7 +442,7 @@ class SessionManager:
         session.name_collection_asked = True
         session.awaiting_name_response = True
         session.pending_question = pending_question  # Store what they were asking before
-        self.update_session(user_id, session)
+        self._touch(session)
     
     def save_customer_name(self, user_id: str, name: str) -> None:
         """
@@ -347,8 +451,8 @@ class SessionManager:
         session = self.get_session(user_id)
         session.customer_name = name.strip()
         session.awaiting_name_response = False
-        self.update_session(user_id, session)
-        logger.info(f"Saved customer name for {user_id}: {name}")
+        self._touch(session)
+        logger.info("Saved customer name for %s: %s", user_id, name)
     
     def get_pending_question(self, user_id: str) -> Optional[str]:
         """
@@ -363,7 +467,7 @@ class SessionManager:
         """
         session = self.get_session(user_id)
         session.pending_question = ""
-        self.update_session(user_id, session)
+        self._touch(session)
     
     def get_customer_name(self, user_id: str) -> Optional[str]:
         """
@@ -384,4 +488,7 @@ class SessionManager:
         Get the organization ID for a user
         """
         session = self.get_session(user_id)
-        return session.org_id if session.org_id else None 
\ No newline at end of file
+        return session.org_id if session.org_id else None 
+
+# Global instance
+session_manager = SessionManager()
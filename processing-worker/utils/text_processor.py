@@ -3,9 +3,57 @@ Professional Text Processing Utilities
 Handles spell checking, typo correction, and message normalization
 """
 
+import functools
 import re
 from typing import Dict, List, Tuple, Optional
 
+
+def keyword_re(keywords) -> "re.Pattern":
+    """Compile plain substrings into one alternation (same semantics as any(k in text ...))"""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+# Common contractions, expanded during cleanup; matched with straight or curly (iOS keyboard) apostrophes
+_CONTRACTIONS = {
+    "don't": "do not",
+    "won't": "will not",
+    "can't": "cannot",
+    "i'm": "i am",
+    "it's": "it is",
+    "that's": "that is"
+}
+
+# All of cleanup in one pass, compiled once: 1) a contraction (tried first, its apostrophe would
+# otherwise be stripped) 2) a whitespace run 3) a special character that doesn't add meaning
+_CLEANUP_RE = re.compile(
+    r"\b(" + "|".join(re.escape(contraction).replace("'", "['’]") for contraction in _CONTRACTIONS) + r")\b"
+    r"|(\s+)"
+    r"|[^\w\s:/\-\.]",
+    re.IGNORECASE
+)
+
+
+# Casual terms dropped from the message rather than corrected
+_FILLER_WORDS = frozenset({'bro'})
+
+# Words that point at one of the listed properties, as whole words ("one" not in "phone", "it" not in "with")
+_PROPERTY_REF_RE = re.compile(r'\b(first|second|third|one|two|three|this|that|it)\b')
+
+
+# Explicit booking words and their inflections, as whole words ("booking" counts, "facebook" or "seem" don't)
+_BOOKING_WORD_RE = re.compile(
+    r'\b(?:book(?:s|ed|ing)?|schedul(?:e|es|ed|ing)|visit(?:s|ed|ing)?|viewings?|appointments?'
+    r'|show(?:s|n|ing)?|see(?:ing)?)\b'
+)
+
+
+def _cleanup_replacement(match: re.Match) -> str:
+    contraction, whitespace = match.groups()
+    if contraction:
+        return _CONTRACTIONS[contraction.lower().replace("’", "'")]
+    return ' ' if whitespace else ''
+
+
 class MessageProcessor:
     """
     Professional message processor that handles typos, spell checking, 
@@ -21,9 +69,7 @@ class MessageProcessor:
             'tommorow': 'tomorrow',
             'tomarrow': 'tomorrow',
             'tonorrow': 'tomorrow',
-            'tomorow': 'tomorrow',
             'tommorrow': 'tomorrow',
-            'tomorow': 'tomorrow',
             
             # Booking related
             'boook': 'book',
@@ -31,7 +77,6 @@ class MessageProcessor:
             'schedual': 'schedule',
             'shedule': 'schedule',
             'shcedule': 'schedule',
-            'appointment': 'appointment',
             'appointement': 'appointment',
             'apointment': 'appointment',
             
@@ -47,7 +92,6 @@ class MessageProcessor:
             'propertes': 'properties',
             
             # Common general typos
-            'i want to': 'i want to',
             'wnat': 'want',
             'waht': 'what',
             'teh': 'the',
@@ -65,16 +109,13 @@ class MessageProcessor:
             'dubaii': 'dubai',
             'duabi': 'dubai',
             'dubao': 'dubai',
-            'marina': 'marina',
             'marnia': 'marina',
-            'jumeirah': 'jumeirah',
             'jumeriah': 'jumeirah',
             'jumerah': 'jumeirah',
             
             # Common chat typos
             'u': 'you',
             'ur': 'your',
-            'bro': '',  # Remove casual terms
             'pls': 'please',
             'plz': 'please',
             'thnks': 'thanks',
@@ -82,21 +123,27 @@ class MessageProcessor:
             'thx': 'thanks'
         }
         
-        # Time patterns for better detection
-        self.time_patterns = [
-            r'(\d{1,2})\s*(am|pm)',
-            r'(\d{1,2}):(\d{2})\s*(am|pm)?',
-            r'(\d{1,2})\s*o\'?clock',
-            r'(morning|afternoon|evening|night)',
-            r'(tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday)',
-        ]
+        # Time expressions for better detection, one alternation so a message is scanned once
+        # (groups are non-capturing so findall returns the matched text; "10:30 am" is tried before "30 am")
+        self.time_pattern = re.compile('|'.join((
+            r'\d{1,2}:\d{2}\s*(?:am|pm)?',
+            r'\d{1,2}\s*(?:am|pm)',
+            r'\d{1,2}\s*o\'?clock',
+            r'morning|afternoon|evening|night',
+            r'tomorrow|today|monday|tuesday|wednesday|thursday|friday|saturday|sunday',
+        )), re.IGNORECASE)
         
-        # Booking intent patterns
-        self.booking_patterns = [
-            r'(book|schedule|visit|viewing|appointment|show|see)',
-            r'(tomorrow|next\s+\w+|this\s+\w+|\d+\s*(am|pm))',
-            r'(available|when|time|date)',
-        ]
+        # Booking intent expressions
+        self.booking_pattern = re.compile('|'.join((
+            r'book|schedule|visit|viewing|appointment|show|see',
+            r'tomorrow|next\s+\w+|this\s+\w+|\d+\s*(?:am|pm)',
+            r'available|when|time|date',
+        )), re.IGNORECASE)
+        
+        # Processed messages by stripped text; greetings and short follow-ups repeat across users.
+        # Wrapped per instance (lru_cache on the method would pin every processor via self); hits are copied
+        # in process_message
+        self._process_cached = functools.lru_cache(maxsize=4096)(self._process)
     
     def process_message(self, message: str) -> Dict[str, any]:
         """
@@ -112,8 +159,22 @@ class MessageProcessor:
                 'confidence': confidence score
             }
         """
-        original = message.strip()
-        
+        result = self._process_cached(message.strip())
+        signals = result['intent_signals']
+        # Fresh lists so callers can't change the cached result
+        return {
+            **result,
+            'corrections_made': list(result['corrections_made']),
+            'intent_signals': {
+                **signals,
+                'time_expressions': list(signals['time_expressions']),
+                'booking_expressions': list(signals['booking_expressions']),
+                'property_references': list(signals['property_references'])
+            }
+        }
+    
+    def _process(self, original: str) -> Dict[str, any]:
+        """Run the processing pipeline on a stripped message (cached by process_message)"""
         # Step 1: Basic cleanup
         cleaned = self._basic_cleanup(original)
         
@@ -137,40 +198,22 @@ class MessageProcessor:
     
     def _basic_cleanup(self, text: str) -> str:
         """Basic text cleanup"""
-        # Remove excessive spaces
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Remove special characters that don't add meaning
-        text = re.sub(r'[^\w\s:/\-\.]', '', text)
-        
-        # Handle common contractions
-        contractions = {
-            "don't": "do not",
-            "won't": "will not", 
-            "can't": "cannot",
-            "i'm": "i am",
-            "it's": "it is",
-            "that's": "that is"
-        }
-        
-        for contraction, expansion in contractions.items():
-            text = text.replace(contraction, expansion)
-        
-        return text.strip()
+        # Expand contractions, collapse excessive spaces and remove special characters in one pass
+        return _CLEANUP_RE.sub(_cleanup_replacement, text).strip()
     
     def _correct_spelling(self, text: str) -> Tuple[str, List[str]]:
         """Professional spell correction with context awareness"""
         words = text.lower().split()
         corrected_words = []
         corrections = []
+        typo_correction = self.typo_corrections.get
         
         for word in words:
-            if word in self.typo_corrections:
-                corrected_word = self.typo_corrections[word]
-                if corrected_word:  # Only add non-empty corrections
-                    corrected_words.append(corrected_word)
-                    corrections.append(f"'{word}' → '{corrected_word}'")
-            else:
+            corrected_word = typo_correction(word)
+            if corrected_word is not None:
+                corrected_words.append(corrected_word)
+                corrections.append(f"'{word}' → '{corrected_word}'")
+            elif word not in _FILLER_WORDS:
                 corrected_words.append(word)
         
         return ' '.join(corrected_words), corrections
@@ -189,25 +232,22 @@ class MessageProcessor:
         text_lower = text.lower()
         
         # Time detection
-        for pattern in self.time_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            if matches:
-                signals['has_time'] = True
-                signals['time_expressions'].extend([str(m) for m in matches])
+        time_expressions = self.time_pattern.findall(text_lower)
+        if time_expressions:
+            signals['has_time'] = True
+            signals['time_expressions'] = time_expressions
         
         # Booking intent detection
-        for pattern in self.booking_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            if matches:
-                signals['has_booking_intent'] = True
-                signals['booking_expressions'].extend([str(m) for m in matches])
+        booking_expressions = self.booking_pattern.findall(text_lower)
+        if booking_expressions:
+            signals['has_booking_intent'] = True
+            signals['booking_expressions'] = booking_expressions
         
-        # Property reference detection
-        property_refs = ['first', 'second', 'third', 'one', 'two', 'three', 'this', 'that', 'it']
-        for ref in property_refs:
-            if ref in text_lower:
-                signals['has_property_reference'] = True
-                signals['property_references'].append(ref)
+        # Property reference detection, in order of first mention
+        property_refs = _PROPERTY_REF_RE.findall(text_lower)
+        if property_refs:
+            signals['has_property_reference'] = True
+            signals['property_references'] = list(dict.fromkeys(property_refs))
         
         return signals
     
@@ -239,10 +279,7 @@ class MessageProcessor:
             return True
         
         # Look for explicit booking words
-        booking_words = ['book', 'schedule', 'visit', 'viewing', 'appointment', 'show', 'see']
-        text_lower = processed_message['corrected'].lower()
-        
-        return any(word in text_lower for word in booking_words)
+        return _BOOKING_WORD_RE.search(processed_message['corrected'].lower()) is not None
     
     def extract_property_reference(self, processed_message: Dict) -> str:
         """Extract property reference from processed message"""